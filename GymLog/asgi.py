@@ -9,8 +9,17 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'GymLog.settings')
+# Read by the settings: no persistent connections (and no WhiteNoise in development) under ASGI
+os.environ['GYMLOG_SERVER'] = 'asgi'
 
 application = get_asgi_application()
+
+# In development, static files are served ahead of the middleware stack, which stays fully async.
+# Django's handler is not meant for production, where WhiteNoise or the front end serves them
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
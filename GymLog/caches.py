@@ -0,0 +1,29 @@
+# GymLog/caches.py
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Backends whose entries are invisible to other worker processes (or never stored at all)
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(cache):
+    """
+    Whether every worker process sees the same entries in `cache`.
+    """
+    return not isinstance(cache, PROCESS_LOCAL_BACKENDS)
+
+
+def shared_cache(alias):
+    """
+    The cache for a CACHES alias when it is shared across processes, else None.
+
+    Used for entries that must be seen by every worker to stay correct
+    (invalidation markers, pins); a per-process cache would let the other
+    workers serve stale data.
+    """
+    if not alias:
+        return None
+    cache = caches[alias]
+    return cache if is_shared(cache) else None
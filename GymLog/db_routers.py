@@ -0,0 +1,147 @@
+# GymLog/db_routers.py
+
+import random
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+from GymLog.caches import shared_cache
+
+# Whether reads in the current request (or task) may go to a replica
+_replica_reads = ContextVar('replica_reads', default=False)
+
+_PINNED_KEY = 'db:pinned:{user_id}'
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads():
+    """
+    Let reads inside the block go to a replica (writes and transactions stay on the primary).
+    """
+    token = _replica_reads.set(bool(replica_aliases()))
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def pin_cache():
+    """
+    The cache holding read-your-writes pins.
+
+    Every worker must see a pin, or a user's next request, served by another
+    worker, would read from a replica that may not have their write yet.
+    """
+    cache = shared_cache(getattr(settings, 'REPLICA_PIN_CACHE_ALIAS', None))
+    if cache is None:
+        raise ImproperlyConfigured(
+            "Read replicas need REPLICA_PIN_CACHE_ALIAS to name a cache shared by every worker "
+            "(e.g. Redis or Memcached), not a process-local one."
+        )
+    return cache
+
+
+def pin_to_primary(user_id):
+    """
+    Send the user's reads to the primary for REPLICA_PIN_SECONDS, so they see their own writes.
+    """
+    pin_cache().set(_PINNED_KEY.format(user_id=user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+async def apin_to_primary(user_id):
+    await pin_cache().aset(_PINNED_KEY.format(user_id=user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def is_pinned(user_id):
+    return bool(pin_cache().get(_PINNED_KEY.format(user_id=user_id)))
+
+
+class ReplicaRouter:
+    """
+    Routes reads to a random replica inside replica_reads(), everything else to the primary.
+
+    Reads inside a transaction on the primary stay there, so an atomic
+    block always sees its own writes. Only the primary is migrated; the
+    replicas get their schema through replication.
+    """
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replica_aliases())
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True # Every alias holds the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    Serves a view's safe requests from a replica, unless the user wrote recently.
+
+    Enabled after authentication, so the read-your-writes pin can be checked
+    for the requesting user.
+    """
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if replica_aliases() and request.method in SAFE_METHODS and not is_pinned(request.user.pk):
+            self._replica_token = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            self._replica_token = None
+            _replica_reads.reset(token)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaPinMiddleware:
+    """
+    Pins users to the primary after a successful write request, whichever view handled it.
+
+    Runs natively under WSGI and ASGI, so it never makes Django adapt the chain to threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        if replica_aliases():
+            pin_cache() # Fail at startup, not on the first write
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        user_id = self.user_to_pin(request, response)
+        if user_id is not None:
+            pin_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user_id = self.user_to_pin(request, response)
+        if user_id is not None:
+            await apin_to_primary(user_id)
+        return response
+
+    def user_to_pin(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_aliases():
+            # DRF copies the authenticated user onto the underlying request
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                return user.pk
+        return None
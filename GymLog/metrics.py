@@ -0,0 +1,326 @@
+# GymLog/metrics.py
+
+import logging
+import threading
+import time
+import traceback
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the request latency histogram buckets
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+MAX_STACKS = 5 # Query stacks kept per request for the slow request log
+STACK_DEPTH = 8 # Project frames kept per stack
+
+
+def metrics_setting(name, default):
+    return getattr(settings, f'METRICS_{name}', default)
+
+
+class RouteStats:
+    """
+    Running totals for one (method, route, status class).
+    """
+    __slots__ = (
+        'count', 'buckets', 'seconds', 'queries', 'db_seconds', 'serialize_seconds', 'render_seconds', 'response_bytes',
+    )
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.buckets = [0] * bucket_count
+        self.seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.render_seconds = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    """
+    Process-local request metrics.
+
+    Each worker process keeps its own totals; Prometheus scrapes every
+    worker (or sums them) as it would any multi-process target.
+    """
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, key, seconds, queries, db_seconds, serialize_seconds, render_seconds, response_bytes):
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = RouteStats(len(self.buckets))
+            stats.count += 1
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats.buckets[index] += 1
+                    break
+            stats.seconds += seconds
+            stats.queries += queries
+            stats.db_seconds += db_seconds
+            stats.serialize_seconds += serialize_seconds
+            stats.render_seconds += render_seconds
+            stats.response_bytes += response_bytes
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            routes = sorted(self._routes.items())
+            snapshot = [(key, _copy(stats)) for key, stats in routes]
+
+        lines = [
+            '# HELP gymlog_request_duration_seconds Request latency.',
+            '# TYPE gymlog_request_duration_seconds histogram',
+        ]
+        for key, stats in snapshot:
+            labels = _labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, stats.buckets):
+                cumulative += count
+                lines.append(f'gymlog_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'gymlog_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f'gymlog_request_duration_seconds_sum{{{labels}}} {stats.seconds:.6f}')
+            lines.append(f'gymlog_request_duration_seconds_count{{{labels}}} {stats.count}')
+
+        for name, attribute, help_text in (
+            ('gymlog_db_queries_total', 'queries', 'Database queries executed.'),
+            ('gymlog_db_seconds_total', 'db_seconds', 'Time spent in database queries.'),
+            ('gymlog_serialize_seconds_total', 'serialize_seconds', 'Time spent serializing response data.'),
+            ('gymlog_render_seconds_total', 'render_seconds', 'Time spent rendering responses.'),
+            ('gymlog_response_bytes_total', 'response_bytes', 'Response body bytes (non-streaming responses).'),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for key, stats in snapshot:
+                value = getattr(stats, attribute)
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(f'{name}{{{_labels(key)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(stats):
+    copy = RouteStats(len(stats.buckets))
+    for attribute in RouteStats.__slots__:
+        value = getattr(stats, attribute)
+        setattr(copy, attribute, list(value) if isinstance(value, list) else value)
+    return copy
+
+
+def _labels(key):
+    method, route, status = key
+    route = route.replace('\\', '\\\\').replace('"', '\\"')
+    return f'method="{method}",route="{route}",status="{status}"'
+
+
+registry = MetricsRegistry(metrics_setting('LATENCY_BUCKETS', DEFAULT_LATENCY_BUCKETS))
+
+
+def project_stack():
+    """
+    The innermost project frames of the current stack (library and metrics frames skipped).
+    """
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-1]
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return traceback.format_list(frames[-STACK_DEPTH:])
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting a request's queries and their time.
+
+    Stacks are captured only for queries worth explaining in the slow
+    request log: individually slow ones, and those past the query budget.
+    """
+    def __init__(self, slow_query_seconds, query_budget):
+        self.slow_query_seconds = slow_query_seconds
+        self.query_budget = query_budget
+        self.count = 0
+        self.seconds = 0.0
+        self.stacks = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.stacks) < MAX_STACKS and (
+                elapsed >= self.slow_query_seconds or self.count > self.query_budget
+            ):
+                self.stacks.append((elapsed, sql, project_stack()))
+
+
+# The recorder of the request being handled; a context variable, so it follows the request into the
+# thread sync_to_async runs a sync view in (which has its own connections under ASGI)
+_current_recorder = ContextVar('metrics_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_recorder(connection, **kwargs):
+    """
+    Add record_query to a connection once, first, so it outlasts the wrappers of execute_wrapper() blocks.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+connection_created.connect(install_recorder, dispatch_uid='gymlog_metrics_recorder')
+
+
+@contextmanager
+def measure_serialization(request):
+    """
+    Count the block (typically reading a serializer's `.data`) as the request's serialization time.
+    """
+    request = getattr(request, '_request', request) # DRF's Request wraps the one the middleware sees
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if hasattr(request, '_metrics_serialize_seconds'): # Metrics enabled
+            request._metrics_serialize_seconds += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Records latency, query count and time, serialization and render time, and response size
+    per route, and logs requests over METRICS_SLOW_REQUEST_MS or
+    METRICS_SLOW_REQUEST_QUERIES with the stacks of their offending queries.
+
+    Place it first in MIDDLEWARE so the timings cover the whole stack and
+    the render timer starts last. It runs natively under WSGI and ASGI, so
+    it never makes Django adapt the chain to threads.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_request_seconds = metrics_setting('SLOW_REQUEST_MS', 500) / 1000
+        self.slow_request_queries = metrics_setting('SLOW_REQUEST_QUERIES', 50)
+        self.slow_query_seconds = metrics_setting('SLOW_QUERY_MS', 100) / 1000
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not metrics_setting('ENABLED', True):
+            return self.get_response(request)
+
+        recorder, start = self.start(request)
+        with self.recording(recorder):
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        if not metrics_setting('ENABLED', True):
+            return await self.get_response(request)
+
+        recorder, start = self.start(request)
+        with self.recording(recorder):
+            response = await self.get_response(request)
+        return self.finish(request, response, recorder, start)
+
+    def start(self, request):
+        request._metrics_serialize_seconds = 0.0
+        request._metrics_render_seconds = 0.0
+        return QueryRecorder(self.slow_query_seconds, self.slow_request_queries), time.perf_counter()
+
+    @contextmanager
+    def recording(self, recorder):
+        for connection in connections.all(): # Those already open; new ones get it on connecting
+            install_recorder(connection)
+        token = _current_recorder.set(recorder)
+        try:
+            yield
+        finally:
+            _current_recorder.reset(token)
+
+    def finish(self, request, response, recorder, start):
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        route = match.route if match is not None else 'unmatched'
+        response_bytes = 0 if response.streaming else len(response.content)
+        registry.observe(
+            (request.method, route, f'{response.status_code // 100}xx'),
+            elapsed, recorder.count, recorder.seconds, request._metrics_serialize_seconds,
+            request._metrics_render_seconds, response_bytes,
+        )
+
+        if elapsed >= self.slow_request_seconds or recorder.count > self.slow_request_queries:
+            self.log_slow_request(request, response, elapsed, recorder)
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Time the render that follows (DRF responses are rendered after every view returns).
+        """
+        start = time.perf_counter()
+
+        def stop(response):
+            request._metrics_render_seconds = time.perf_counter() - start
+
+        response.add_post_render_callback(stop)
+        return response
+
+    def log_slow_request(self, request, response, elapsed, recorder):
+        details = ''.join(
+            f'\n{seconds * 1000:.1f}ms {sql[:200]}\n' + ''.join(frames)
+            for seconds, sql, frames in recorder.stacks
+        )
+        logger.warning(
+            "Slow request %s %s -> %s: %.1fms, %d queries (%.1fms in the database), %.1fms serializing, "
+            "%.1fms rendering%s",
+            request.method, request.get_full_path(), response.status_code, elapsed * 1000,
+            recorder.count, recorder.seconds * 1000, request._metrics_serialize_seconds * 1000,
+            request._metrics_render_seconds * 1000, details,
+        )
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint.
+
+    Requires `Authorization: Bearer <METRICS_TOKEN>` when METRICS_TOKEN is
+    set; without a token it is only served with DEBUG on.
+    """
+    token = metrics_setting('TOKEN', None)
+    if token:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not constant_time_compare(supplied, token):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseNotFound()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
+import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,7 +54,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'GymLog.metrics.MetricsMiddleware', # First, so its timings cover every other middleware
     'django.middleware.security.SecurityMiddleware',
+    'GymLog.db_routers.ReplicaPinMiddleware', # Keeps users who just wrote on the primary database
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +67,19 @@ MIDDLEWARE = [
 
 ]
 
+# Set by GymLog/asgi.py
+SERVING_ASGI = os.environ.get('GYMLOG_SERVER') == 'asgi'
+# Set GYMLOG_STATIC_FROM_PROXY=1 when a front-end server or CDN serves STATIC_URL, so static
+# requests never reach Django
+STATIC_FROM_PROXY = os.environ.get('GYMLOG_STATIC_FROM_PROXY', '').lower() in ('1', 'true', 'yes')
+# WhiteNoise serves static files in production. It is sync-only: under ASGI it makes Django run the
+# whole middleware chain through sync_to_async/async_to_sync, adding a thread hop to every request
+# (async views included), while every other middleware here handles async requests natively. It is
+# dropped when the front end serves static files, and under ASGI in development, where
+# GymLog/asgi.py serves them with Django's (development-only) static files handler instead.
+if STATIC_FROM_PROXY or (SERVING_ASGI and DEBUG):
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'GymLog.urls'
 
 TEMPLATES = [
@@ -96,6 +114,57 @@ DATABASES = {
     }
 }
 
+# DATABASE_URL (set by Heroku Postgres) overrides the database above; `sqlite:///bench.sqlite3` suits local benchmarks
+if os.environ.get('DATABASE_URL'):
+    DATABASES['default'] = dj_database_url.parse(os.environ['DATABASE_URL'])
+
+# Keep connections open across requests (DB_CONN_MAX_AGE seconds; 0 closes them after each request)
+# instead of paying the TCP and authentication handshake every time. Health checks replace a
+# connection that dropped while idle before a request uses it.
+DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+# Under ASGI every request runs its queries in a fresh sync_to_async context, so a persistent
+# connection is never reused and is only closed when it expires: with CONN_MAX_AGE > 0 they pile up
+# until the database refuses new ones. Django's documentation says to disable persistent
+# connections under ASGI and use a pool (DB_POOL below) instead.
+if SERVING_ASGI:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# DB_POOL=1 uses psycopg 3's connection pool on PostgreSQL instead of one persistent connection per
+# thread. Each process opens up to DB_POOL_MAX_SIZE connections, so keep workers × max size within
+# the database's connection limit. Pooled connections are returned after every request, which is
+# why persistent connections are turned off.
+if os.environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes'):
+    if DATABASES['default']['ENGINE'] != 'django.db.backends.postgresql':
+        raise ImproperlyConfigured("DB_POOL requires a PostgreSQL database.")
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 4)),
+        'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)), # Seconds to wait for a free connection
+    }
+
+# Read replicas: DATABASE_REPLICA_URLS is a comma-separated list of database URLs (e.g. a second
+# `sqlite:///replica.sqlite3` locally). Views using ReplicaReadMixin read from a random replica,
+# except for users who wrote in the last REPLICA_PIN_SECONDS (see GymLog.db_routers). Tests
+# mirror the replicas onto the primary database.
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(','))):
+    alias = f'replica{index + 1}'
+    DATABASES[alias] = dj_database_url.parse(url.strip())
+    DATABASES[alias]['CONN_MAX_AGE'] = DATABASES['default']['CONN_MAX_AGE']
+    DATABASES[alias]['CONN_HEALTH_CHECKS'] = True
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    if DATABASES['default'].get('OPTIONS', {}).get('pool') and DATABASES[alias]['ENGINE'] == DATABASES['default']['ENGINE']:
+        DATABASES[alias].setdefault('OPTIONS', {})['pool'] = dict(DATABASES['default']['OPTIONS']['pool'])
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['GymLog.db_routers.ReplicaRouter']
+# Pins live in this CACHES alias. Required with DATABASE_REPLICA_URLS, and it must be shared by every
+# worker (e.g. Redis or Memcached): a pin kept in one process's locmem would not stop another worker
+# from reading the user's stale data from a replica
+REPLICA_PIN_CACHE_ALIAS = None
+REPLICA_PIN_SECONDS = 10 # Comfortably above normal replication lag
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -115,30 +184,53 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Renderer/parser profiles, picked with GYMLOG_API_PROFILE (defaults to 'debug' when DEBUG is on).
+# Production renders JSON only: the browsable API builds HTML forms (including choice lists from
+# whole tables) on every request a browser makes. Views that take uploads declare their own parsers.
+API_PROFILES = {
+    'production': {
+        'renderers': [
+            'GymLog.renderers.ORJSONRenderer', # Same output as JSONRenderer, encoded with orjson when installed
+        ],
+        'parsers': [
+            'rest_framework.parsers.JSONParser',
+            'rest_framework.parsers.FormParser',
+        ],
+    },
+    'debug': {
+        'renderers': [
+            'GymLog.renderers.ORJSONRenderer',
+            'rest_framework.renderers.BrowsableAPIRenderer', # Browsable API UI
+        ],
+        'parsers': [
+            'rest_framework.parsers.JSONParser',
+            'rest_framework.parsers.FormParser',
+            'rest_framework.parsers.MultiPartParser', # Forms posted from the browsable API
+        ],
+    },
+}
+API_PROFILE = os.environ.get('GYMLOG_API_PROFILE', 'debug' if DEBUG else 'production')
+if API_PROFILE not in API_PROFILES:
+    raise ImproperlyConfigured(f"GYMLOG_API_PROFILE must be one of: {', '.join(API_PROFILES)}")
+
 # Tells DRF to use JWT for all API endpoints by default
 REST_FRAMEWORK = {
 
-    # Response formats: JSON + browsable API UI
-    'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ],
+    # Response formats for the active API profile
+    'DEFAULT_RENDERER_CLASSES': API_PROFILES[API_PROFILE]['renderers'],
 
     # Use JWT Authentication by default
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Stateless: the user is built from token claims, without a query per request
+        'rest_framework_simplejwt.authentication.JWTStatelessUserAuthentication',
     ],
 
     # Pagination: 10 items per page
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10, # Number of items per page
 
-    # Request parsers: JSON, form data, file uploads
-    'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
-        'rest_framework.parsers.FormParser',
-        'rest_framework.parsers.MultiPartParser'
-    ]
+    # Request parsers for the active API profile
+    'DEFAULT_PARSER_CLASSES': API_PROFILES[API_PROFILE]['parsers'],
 }
 
 SIMPLE_JWT = {
@@ -147,18 +239,56 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': False,  # Don't issue new refresh tokens on refresh
     'BLACKLIST_AFTER_ROTATION': True,  # Blacklist used refresh tokens
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_USER_CLASS': 'users.authentication.ProfileTokenUser',
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.ProfileTokenObtainPairSerializer', # Adds the weight claim
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.CachedTokenRefreshSerializer',
 }
 
+# Set to a shared CACHES alias (e.g. Redis) to answer refresh-token blacklist checks from the cache;
+# None (or a process-local cache, which would miss logouts in other workers) checks the database
+# on every refresh
+TOKEN_BLACKLIST_CACHE_ALIAS = None
+
+# Set to a shared CACHES alias (e.g. Redis) to trust the weight claim in access tokens and cache
+# full profiles briefly; profile updates mark the claims stale there for every worker. None (or a
+# process-local cache such as the default locmem) reads the profile from the database when needed
+PROFILE_CACHE_ALIAS = None
+PROFILE_CACHE_TIMEOUT = 60
+
 AUTH_USER_MODEL = 'users.UserProfile'
 
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',  # default
 ]
 
+# Category catalog cache: set to a CACHES alias (e.g. Redis/Memcached) to share
+# invalidations across workers; otherwise each process caches for CATEGORY_CACHE_TIMEOUT seconds
+# and stored analytics resolve the strength category from the database instead
+CATEGORY_CACHE_ALIAS = None
+CATEGORY_CACHE_TIMEOUT = 300
+
 # Tell Django where to upload uploaded media
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Background threads generating resized image renditions (0 = generate inline)
+IMAGE_RENDITION_WORKERS = 2
+
+# Limits enforced while image uploads stream in (see workouts.uploads)
+IMAGE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_DIMENSION = 8192 # Pixels per side
+IMAGE_UPLOAD_MAX_PIXELS = 40_000_000
+
+# Per-route request metrics (see GymLog.metrics), scraped from /metrics/. Requests slower than
+# METRICS_SLOW_REQUEST_MS or running more than METRICS_SLOW_REQUEST_QUERIES queries are logged
+# with the stacks of their slow (>= METRICS_SLOW_QUERY_MS) or over-budget queries
+METRICS_ENABLED = True
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_SLOW_REQUEST_QUERIES = 50
+METRICS_SLOW_QUERY_MS = 100
+# Bearer token required to scrape /metrics/; without one the endpoint is only served with DEBUG on
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -179,7 +309,17 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# STORAGES replaces STATICFILES_STORAGE (ignored since Django 5.1); static files keep the plain
+# storage that was in effect, while uploads are deduplicated by content (see workouts.storage)
+STORAGES = {
+    'default': {
+        'BACKEND': 'workouts.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 
 
 # Default primary key field type
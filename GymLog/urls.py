@@ -19,15 +19,18 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from users.views import api_root
+from workouts.views import serve_media
+from GymLog.metrics import metrics_view
 
 urlpatterns = [
     path('', api_root, name='api-root'), # Root API endpoint
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'), # Prometheus scrape endpoint
     path('api/users/', include('users.urls')),
     path('api/workouts/', include('workouts.urls')),
 ]
 
 # Serve media files in development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
 
@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from django.db import transaction
+        from django.db.models.signals import post_delete, post_save
+        from .authentication import profile_changed
+        from .models import UserProfile
+
+        # Cached profiles and profile claims in issued tokens go stale on any profile write
+        # (a new user has no tokens yet). Marked after commit, so a refresh that reads the
+        # profile in between cannot embed the old values with a newer issue time.
+        def on_profile_write(sender, instance, created=False, **kwargs):
+            if not created:
+                pk = instance.pk
+                transaction.on_commit(lambda: profile_changed(pk))
+
+        post_save.connect(on_profile_write, sender=UserProfile, weak=False, dispatch_uid='users.profile_changed')
+        post_delete.connect(on_profile_write, sender=UserProfile, weak=False, dispatch_uid='users.profile_changed')
@@ -0,0 +1,112 @@
+# users/authentication.py
+
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from GymLog.caches import shared_cache
+
+WEIGHT_CLAIM = 'weight'
+
+_PROFILE_KEY = 'users:profile:{pk}'
+_CHANGED_KEY = 'users:profile:{pk}:changed'
+
+
+def profile_cache():
+    """
+    The shared cache holding profiles and changed markers, or None to always ask the database.
+
+    Markers only work when every worker sees them, so a process-local cache counts as none.
+    """
+    return shared_cache(getattr(settings, 'PROFILE_CACHE_ALIAS', None))
+
+
+def add_profile_claims(token, user):
+    """
+    Copy the profile fields read on hot paths into a token's claims.
+    """
+    token[WEIGHT_CLAIM] = str(user.weight) if user.weight is not None else None
+    return token
+
+
+def get_profile(pk):
+    """
+    The full UserProfile for an id, cached for PROFILE_CACHE_TIMEOUT seconds.
+    """
+    from .models import UserProfile
+
+    cache = profile_cache()
+    if cache is None:
+        return UserProfile.objects.get(pk=pk)
+
+    key = _PROFILE_KEY.format(pk=pk)
+    profile = cache.get(key)
+    if profile is None:
+        profile = UserProfile.objects.get(pk=pk)
+        cache.set(key, profile, settings.PROFILE_CACHE_TIMEOUT)
+    return profile
+
+
+def profile_changed(pk):
+    """
+    Drop the cached profile and mark profile claims in tokens issued until now as stale.
+
+    Call once the profile write has committed, so a token refreshed after the
+    marker is set can only have read the new profile.
+    """
+    cache = profile_cache()
+    if cache is None:
+        return
+    cache.delete(_PROFILE_KEY.format(pk=pk))
+    # Tokens (and access tokens refreshed from them) live no longer than the refresh lifetime
+    timeout = int(jwt_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    cache.set(_CHANGED_KEY.format(pk=pk), time.time(), timeout)
+
+
+def claims_are_current(pk, issued_at):
+    """
+    Whether profile claims in a token issued at `issued_at` still match the profile.
+
+    Without a shared cache there is no record of changes, so claims are never trusted.
+    """
+    cache = profile_cache()
+    if cache is None:
+        return False
+    changed_at = cache.get(_CHANGED_KEY.format(pk=pk))
+    return changed_at is None or (issued_at is not None and changed_at < issued_at)
+
+
+class ProfileTokenUser(TokenUser):
+    """
+    User built from access token claims, without a database query
+    (JWTStatelessUserAuthentication with SIMPLE_JWT['TOKEN_USER_CLASS']).
+
+    `weight` comes from the token unless the profile changed after the token
+    was issued (or changes cannot be tracked without a shared cache);
+    `profile` loads the full UserProfile (briefly cached) for views that
+    need every field.
+    """
+    @cached_property
+    def id(self):
+        # Tokens carry the id as a string; use the primary key's own type so ids match model values
+        from .models import UserProfile
+
+        return UserProfile._meta.pk.to_python(self.token[jwt_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def profile(self):
+        return get_profile(self.pk)
+
+    @cached_property
+    def weight(self):
+        if WEIGHT_CLAIM in self.token and claims_are_current(self.pk, self.token.get('iat')):
+            value = self.token[WEIGHT_CLAIM]
+            return Decimal(value) if value is not None else None
+        return self.profile.weight
+
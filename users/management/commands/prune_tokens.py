@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding refresh tokens and their blacklist entries, in batches. "
+        "Meant to run on a schedule (e.g. daily cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of tokens examined per batch")
+
+    def handle(self, *args, batch_size, **options):
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        now = aware_utcnow()
+        last_pk = 0
+        examined = pruned = 0
+
+        # Walk the table by primary key (expires_at is not indexed), so each batch is a
+        # bounded range scan and a short transaction instead of one huge DELETE
+        while True:
+            batch = list(
+                OutstandingToken.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'expires_at')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            examined += len(batch)
+
+            expired = [pk for pk, expires_at in batch if expires_at <= now]
+            if expired:
+                # Blacklist entries cascade with their outstanding token
+                OutstandingToken.objects.filter(pk__in=expired).delete()
+                pruned += len(expired)
+
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} expired tokens ({examined} examined)."))
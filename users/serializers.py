@@ -1,22 +1,31 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .authentication import add_profile_claims
 from .models import UserProfile
+from .tokens import CachedRefreshToken, ProfileRefreshToken
+from workouts.images import rendition_urls, schedule_renditions
 
 # Serializer for creating a new user profile
 class UserProfileSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     age = serializers.ReadOnlyField() # To display the calculated age
+    profile_picture_renditions = serializers.SerializerMethodField() # Resized WebP/JPEG versions of the picture
 
     class Meta:
         model = UserProfile
         fields = (
             'id', 'username', 'email', 'password', 'first_name', 'last_name',
-            'height', 'weight', 'date_of_birth', 'gender', 'profile_picture', 'age'
+            'height', 'weight', 'date_of_birth', 'gender', 'profile_picture',
+            'profile_picture_renditions', 'age'
         )
         read_only_fields = ('id', 'age')
         extra_kwargs = {
             'password': {'write_only': True}
         }
 
+    def get_profile_picture_renditions(self, obj):
+        return rendition_urls(obj.profile_picture, self.context.get('request'))
+
     def create(self, validated_data):
         # Extract profile picture separately
 
@@ -45,19 +54,28 @@ class UserProfileSerializer(serializers.ModelSerializer):
             user.profile_picture = profile_picture
             
         user.save()
+
+        # Generate resized versions of the picture in the background
+        if profile_picture:
+            schedule_renditions(user.profile_picture)
         return user
     
 # Serializer for updating an existing user profile
 class UserProfileUpdateSerializer(serializers.ModelSerializer):
     age = serializers.ReadOnlyField()
+    profile_picture_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
         fields = (
             'id', 'username', 'email', 'first_name', 'last_name',
-            'height', 'weight', 'date_of_birth', 'gender', 'profile_picture', 'age'
+            'height', 'weight', 'date_of_birth', 'gender', 'profile_picture',
+            'profile_picture_renditions', 'age'
         )
         read_only_fields = ('id', 'username', 'email', 'age')
+
+    def get_profile_picture_renditions(self, obj):
+        return rendition_urls(obj.profile_picture, self.context.get('request'))
         
     def update(self, instance, validated_data):
         # Handle profile picture update separately
@@ -72,4 +90,20 @@ class UserProfileUpdateSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
-        return instance
\ No newline at end of file
+
+        if profile_picture:
+            schedule_renditions(instance.profile_picture)
+        return instance
+
+# Login serializer embedding the profile claims read by ProfileTokenUser
+class ProfileTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = CachedRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        return add_profile_claims(super().get_token(user), user)
+
+# Token refresh serializer checking the blacklist through the shared cache and
+# re-reading the profile claims, so a profile update is picked up on refresh
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ProfileRefreshToken
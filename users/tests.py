@@ -1,3 +1,166 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import aware_utcnow
+from .authentication import ProfileTokenUser
+from .models import UserProfile
+from .tokens import CachedRefreshToken
 
-# Create your tests here.
+PASSWORD = 'test-pass-123'
+
+# A file-based cache is visible to every worker process, like Redis or Memcached
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'gymlog-test-cache'),
+    },
+}
+
+
+@override_settings(
+    CACHES=SHARED_CACHES, PROFILE_CACHE_ALIAS='shared',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], # Fast logins
+)
+class ProfileClaimTests(TestCase):
+    """
+    Token users read the weight claim only while it matches the profile.
+    """
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = UserProfile.objects.create_user(
+            username='lifter', email='lifter@example.com', password=PASSWORD, weight=Decimal('80')
+        )
+        self.client = APIClient()
+
+    def log_in(self):
+        response = self.client.post(
+            reverse('user-login'), {'email': 'lifter@example.com', 'password': PASSWORD}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def update_weight(self, access, weight):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('user-profile'), {'weight': weight})
+        self.assertEqual(response.status_code, 200)
+
+    def token_user(self, access):
+        return ProfileTokenUser(AccessToken(access))
+
+    def test_id_has_primary_key_type(self):
+        user = self.token_user(self.log_in()['access'])
+
+        self.assertIsInstance(user.pk, int)
+        self.assertEqual({self.user.pk: 'found'}.get(user.pk), 'found')
+
+    def test_weight_read_from_claims(self):
+        user = self.token_user(self.log_in()['access'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(user.weight, Decimal('80'))
+
+    def test_profile_update_makes_claims_stale(self):
+        access = self.log_in()['access']
+        self.update_weight(access, '92.50')
+
+        self.assertEqual(self.token_user(access).weight, Decimal('92.50'))
+
+    def test_refreshed_token_carries_current_weight(self):
+        tokens = self.log_in()
+        self.update_weight(tokens['access'], '92.50')
+
+        response = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.data['access'])['weight'], '92.50')
+        self.assertEqual(self.token_user(response.data['access']).weight, Decimal('92.50'))
+
+    def test_profile_read_after_update(self):
+        access = self.log_in()['access']
+        self.assertEqual(self.token_user(access).profile.weight, Decimal('80')) # Now cached
+        self.update_weight(access, '92.50')
+
+        self.assertEqual(self.token_user(access).profile.weight, Decimal('92.50'))
+
+    @override_settings(PROFILE_CACHE_ALIAS='default')
+    def test_claims_not_trusted_without_shared_cache(self):
+        # Another worker's update could not mark a process-local cache
+        user = self.token_user(self.log_in()['access'])
+        UserProfile.objects.filter(pk=self.user.pk).update(weight=Decimal('92.50'))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.weight, Decimal('92.50'))
+
+
+@override_settings(
+    CACHES=SHARED_CACHES, TOKEN_BLACKLIST_CACHE_ALIAS='shared',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], # Fast logins
+)
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = UserProfile.objects.create_user(
+            username='lifter', email='lifter@example.com', password=PASSWORD, weight=Decimal('80')
+        )
+        self.client = APIClient()
+        response = self.client.post(
+            reverse('user-login'), {'email': 'lifter@example.com', 'password': PASSWORD}, format='json'
+        )
+        self.tokens = response.data
+
+    def refresh(self):
+        return self.client.post(reverse('token_refresh'), {'refresh': self.tokens['refresh']}, format='json')
+
+    def test_check_answered_from_cache(self):
+        with self.assertNumQueries(1):
+            CachedRefreshToken(self.tokens['refresh'])
+        with self.assertNumQueries(0):
+            CachedRefreshToken(self.tokens['refresh'])
+
+    def test_logout_blacklists_cached_token(self):
+        self.assertEqual(self.refresh().status_code, 200) # Caches "not blacklisted"
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('user-logout'), {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 205)
+
+        self.assertEqual(self.refresh().status_code, 401)
+
+    @override_settings(TOKEN_BLACKLIST_CACHE_ALIAS='default')
+    def test_database_checked_without_shared_cache(self):
+        # Another worker's logout could not reach a process-local cache
+        CachedRefreshToken(self.tokens['refresh'])
+        CachedRefreshToken(self.tokens['refresh']).blacklist()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.refresh().status_code, 401)
+
+
+class PruneTokensTests(TestCase):
+    def test_deletes_only_expired_tokens(self):
+        user = UserProfile.objects.create_user(username='lifter', email='lifter@example.com', password=PASSWORD)
+        now = aware_utcnow()
+        tokens = {
+            jti: OutstandingToken.objects.create(
+                user=user, jti=jti, token=jti, created_at=now - timedelta(days=8), expires_at=now + offset,
+            )
+            for jti, offset in (('expired', -timedelta(days=1)), ('live', timedelta(days=1)))
+        }
+        for token in tokens.values():
+            BlacklistedToken.objects.create(token=token)
+
+        call_command('prune_tokens', batch_size=1, stdout=io.StringIO())
+
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertEqual(list(BlacklistedToken.objects.values_list('token__jti', flat=True)), ['live'])
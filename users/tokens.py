@@ -0,0 +1,80 @@
+# users/tokens.py
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from GymLog.caches import shared_cache
+from .authentication import WEIGHT_CLAIM, add_profile_claims, get_profile
+
+_BLACKLISTED_KEY = 'users:blacklisted:{jti}'
+
+
+def blacklist_cache():
+    """
+    The shared cache holding blacklist lookups, or None to always ask the database.
+
+    A logout must reach every worker, or the others would keep answering
+    from their cached "not blacklisted", so a process-local cache counts as none.
+    """
+    return shared_cache(getattr(settings, 'TOKEN_BLACKLIST_CACHE_ALIAS', None))
+
+
+class CachedRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist check is answered from a shared cache.
+
+    Each JTI's blacklisted flag is cached until the token expires. A lookup
+    only adds a missing entry, while blacklisting always overwrites it, so a
+    lookup racing a logout cannot cache a stale "not blacklisted".
+    """
+    def check_blacklist(self):
+        cache = blacklist_cache()
+        if cache is None:
+            return super().check_blacklist()
+
+        jti = self.payload[jwt_settings.JTI_CLAIM]
+        key = _BLACKLISTED_KEY.format(jti=jti)
+        blacklisted = cache.get(key)
+        if blacklisted is None:
+            blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+            cache.add(key, blacklisted, self.remaining_seconds())
+
+        if blacklisted:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+
+        cache = blacklist_cache()
+        if cache is not None:
+            key = _BLACKLISTED_KEY.format(jti=self.payload[jwt_settings.JTI_CLAIM])
+            timeout = self.remaining_seconds()
+            transaction.on_commit(lambda: cache.set(key, True, timeout))
+        return result
+
+    def remaining_seconds(self):
+        remaining = datetime_from_epoch(self.payload['exp']) - self.current_time
+        return max(int(remaining.total_seconds()), 1)
+
+
+class ProfileRefreshToken(CachedRefreshToken):
+    """
+    Refresh token issuing access tokens with profile claims read at refresh time.
+
+    RefreshToken.access_token copies the claims embedded at login, which a
+    profile update since then makes stale while the new token's issue time
+    would vouch for them. The access token is created (and its issue time
+    set) before the profile is read, so a change committed in between is
+    still caught by its changed marker.
+    """
+    @property
+    def access_token(self):
+        access = super().access_token
+        if WEIGHT_CLAIM in self.payload:
+            add_profile_claims(access, get_profile(self.payload[jwt_settings.USER_ID_CLAIM]))
+        return access
@@ -2,14 +2,15 @@ from rest_framework import generics
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from .serializers import UserProfileSerializer, UserProfileUpdateSerializer
 from .models import UserProfile
-from rest_framework.parsers import MultiPartParser, FormParser
+from .tokens import CachedRefreshToken
+from rest_framework.parsers import FormParser
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status, permissions
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from django.urls import reverse
+from workouts.uploads import ImageMultiPartParser
 
 @api_view(['GET'])
 def api_root(request, format=None):
@@ -28,10 +29,16 @@ def api_root(request, format=None):
 
             # Workout-related endpoints
             'workouts_list_create': request.build_absolute_uri(reverse('workout-list-create')),
+            'workouts_bulk_create': request.build_absolute_uri(reverse('workout-bulk-create')),
+            'workouts_export': request.build_absolute_uri(reverse('workout-export')),
+            'workouts_import': request.build_absolute_uri(reverse('workout-import')),
+            'exercise_search': request.build_absolute_uri(reverse('exercise-search')),
+            'personal_records': request.build_absolute_uri(reverse('personal-records')),
             'workout_detail_example': request.build_absolute_uri(reverse('workout-detail', kwargs={'pk': 1})),
             'categories_list_create': request.build_absolute_uri(reverse('category-list-create')),
             'category_detail_example': request.build_absolute_uri(reverse('category-detail', kwargs={'pk': 1})),
             'analytics_generate': request.build_absolute_uri(reverse('analytics-generate')),
+            'analytics_history': request.build_absolute_uri(reverse('analytics-history')),
 
             # Admin-interface
             'admin': request.build_absolute_uri(reverse('admin:index')),
@@ -43,18 +50,21 @@ class UserRegistrationView(generics.CreateAPIView):
     queryset = UserProfile.objects.all()
     serializer_class = UserProfileSerializer
     permission_classes = [AllowAny] # Open to unauthenticated users
-    parser_classes = [MultiPartParser, FormParser] # Support file uploads
+    parser_classes = [ImageMultiPartParser, FormParser] # Support file uploads
 
 # Handles authenticated user profile retrieval and updates
 class UserProfileView(generics.RetrieveUpdateAPIView):
     queryset = UserProfile.objects.all()
     serializer_class = UserProfileUpdateSerializer
     permission_classes = [IsAuthenticated] # Only logged-in users can access
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [ImageMultiPartParser, FormParser]
 
     def get_object(self):
-        # Always return the currently authenticated user
-        return self.request.user
+        # Always return the currently authenticated user; reads may use the briefly cached
+        # profile, updates start from the current row
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user.profile
+        return self.get_queryset().get(pk=self.request.user.pk)
 
 # Handles logout by blacklisting the refresh token
 class LogoutView(APIView):
@@ -67,7 +77,7 @@ class LogoutView(APIView):
                 return Response({"error": "Refresh token is required"}, status=status.HTTP_400_BAD_REQUEST)
             
             # Blacklist the token to invalidate future use
-            token = RefreshToken(refresh_token)
+            token = CachedRefreshToken(refresh_token)
             token.blacklist()  # Adds token to blacklist
             return Response({"message": "Successfully logged out"}, status=status.HTTP_205_RESET_CONTENT)
 
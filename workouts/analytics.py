@@ -0,0 +1,382 @@
+# workouts/analytics.py
+
+import operator
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+from typing import NamedTuple
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, F, FloatField, Max, Q, Sum, Value, When
+from django.db.models.functions import TruncWeek
+from .cache import category_cache
+from .models import Analytics, Category, Workout
+
+# Category names the analytics engine treats specially
+STRENGTH_TRAINING = "Strength Training"
+CARDIO_TRAINING = "Cardiovascular Training"
+
+# MET values used for calorie estimation
+STRENGTH_MET = 6.0
+CARDIO_MET = 7.0
+
+DEFAULT_USER_WEIGHT = 70.0 # Used when the user has not set a weight (kg)
+
+
+def week_start(day):
+    """
+    Return the Monday of the week containing `day`.
+    """
+    return day - timedelta(days=day.weekday())
+
+
+def user_weight_of(user):
+    """
+    Body weight used in calorie and strength-level formulas.
+    """
+    return float(user.weight) if user.weight else DEFAULT_USER_WEIGHT
+
+
+def strength_category_id():
+    """
+    Id of the strength category for analytics that get stored.
+
+    A process-local snapshot may predate a category change made in another
+    worker, so without a shared category cache the id comes from the primary.
+    """
+    if category_cache.shared is None:
+        categories = Category.objects.db_manager(router.db_for_write(Category))
+        return categories.filter(name=STRENGTH_TRAINING).values_list('pk', flat=True).first()
+    return category_cache.id_for(STRENGTH_TRAINING)
+
+
+def strength_condition():
+    """
+    Match strength workouts by category id when a shared category cache
+    resolves it, else by name through a join.
+    """
+    if category_cache.shared is None:
+        return Q(category__name=STRENGTH_TRAINING)
+    strength_id = category_cache.id_for(STRENGTH_TRAINING)
+    if strength_id is None:
+        # No such category, so nothing matches; let the join say so
+        return Q(category__name=STRENGTH_TRAINING)
+    return Q(category_id=strength_id)
+
+
+def weekly_aggregates():
+    """
+    Conditional aggregates computing every weekly metric in a single SQL pass.
+    """
+    is_strength = strength_condition()
+
+    return {
+        'workout_count': Count('id'),
+        'total_volume': Sum(F('weight_used') * F('reps') * F('sets'), filter=is_strength),
+        'max_lift': Max('weight_used', filter=is_strength),
+        'duration': Sum('workout_duration_minutes'),
+        # MET-weighted minutes: strength rows count at STRENGTH_MET, everything else at CARDIO_MET
+        'met_minutes': Sum(
+            Case(
+                When(is_strength, then=Value(STRENGTH_MET)),
+                default=Value(CARDIO_MET),
+                output_field=FloatField(),
+            ) * F('workout_duration_minutes'),
+            output_field=FloatField(),
+        ),
+    }
+
+
+def strength_level_for(max_lift, user_weight):
+    """
+    Categorize strength based on max lift relative to body weight.
+    """
+    if max_lift >= 1.5 * user_weight:
+        return "Advanced"
+    if max_lift >= 1.0 * user_weight:
+        return "Intermediate"
+    return "Beginner"
+
+
+def derived_metrics(total_volume, max_lift, met_minutes, duration, user_weight):
+    """
+    Metrics derived from the weekly running totals and the user's body weight.
+    """
+    # Estimate calories burned using MET formula
+    total_calories = met_minutes * 3.5 * user_weight / 200
+
+    # Compute average intensity
+    intensity = total_volume / duration if duration > 0 else 0
+
+    return {
+        'average_intensity': round(intensity, 2),
+        'strength_level': strength_level_for(max_lift, user_weight),
+        'total_calories_burned': round(total_calories),
+    }
+
+
+def build_analytics_data(totals, user_weight):
+    """
+    Turn the raw aggregate totals into the fields stored on Analytics.
+    """
+    data = {
+        'workout_count': totals['workout_count'],
+        'total_volume': totals['total_volume'] or 0,
+        'max_lift': totals['max_lift'] or 0,
+        'met_minutes': totals['met_minutes'] or 0,
+        'weekly_workout_duration_minutes': totals['duration'] or 0,
+    }
+    data.update(derived_metrics(
+        data['total_volume'], data['max_lift'], data['met_minutes'],
+        data['weekly_workout_duration_minutes'], user_weight
+    ))
+    return data
+
+
+def refresh_derived(record, user_weight):
+    """
+    Recompute derived fields on an Analytics row in memory.
+
+    Returns the names of the fields that changed (e.g. after a body weight update).
+    """
+    metrics = derived_metrics(
+        record.total_volume, record.max_lift, record.met_minutes,
+        record.weekly_workout_duration_minutes, user_weight
+    )
+    changed = []
+    for field, value in metrics.items():
+        if getattr(record, field) != value:
+            setattr(record, field, value)
+            changed.append(field)
+    return changed
+
+
+def weekly_workouts(user_id, week_start_date):
+    """
+    Workouts logged by a user in the week starting at `week_start_date`.
+    """
+    return Workout.objects.filter(
+        user_id=user_id,
+        date__gte=week_start_date,
+        date__lt=week_start_date + timedelta(days=7),
+    )
+
+
+def recompute_week(user_id, week_start_date, user_weight):
+    """
+    Rebuild one user's Analytics row for a week from their workouts.
+
+    Returns the saved row, or None when the week has no workouts.
+    """
+    totals = weekly_workouts(user_id, week_start_date).aggregate(**weekly_aggregates())
+
+    if not totals['workout_count']:
+        Analytics.objects.filter(user_id=user_id, week_start_date=week_start_date).delete()
+        return None
+
+    record, _ = Analytics.objects.update_or_create(
+        user_id=user_id,
+        week_start_date=week_start_date,
+        defaults=build_analytics_data(totals, user_weight)
+    )
+    return record
+
+
+async def arecompute_week(user_id, week_start_date, user_weight):
+    """
+    Async counterpart of recompute_week, for async views.
+    """
+    totals = await weekly_workouts(user_id, week_start_date).aaggregate(**weekly_aggregates())
+
+    if not totals['workout_count']:
+        await Analytics.objects.filter(user_id=user_id, week_start_date=week_start_date).adelete()
+        return None
+
+    record, _ = await Analytics.objects.aupdate_or_create(
+        user_id=user_id,
+        week_start_date=week_start_date,
+        defaults=build_analytics_data(totals, user_weight)
+    )
+    return record
+
+
+class WorkoutContribution(NamedTuple):
+    """
+    What a single workout adds to its week's Analytics totals.
+    """
+    week_start_date: object
+    is_strength: bool
+    weight_used: object
+    volume: object
+    duration: int
+
+    @classmethod
+    def from_workout(cls, workout):
+        is_strength = (
+            workout.category_id is not None
+            and workout.category_id == strength_category_id()
+        )
+        volume = 0
+        if is_strength and None not in (workout.weight_used, workout.reps, workout.sets):
+            volume = workout.weight_used * workout.reps * workout.sets
+
+        return cls(
+            week_start_date=week_start(workout.date),
+            is_strength=is_strength,
+            weight_used=workout.weight_used,
+            volume=volume,
+            duration=workout.workout_duration_minutes or 0,
+        )
+
+    @property
+    def met_minutes(self):
+        return (STRENGTH_MET if self.is_strength else CARDIO_MET) * self.duration
+
+
+@transaction.atomic
+def apply_workout_changes(user_id, user_weight, removed=(), added=()):
+    """
+    Apply workout deltas to the affected weekly Analytics rows.
+
+    Must be called after the workout write itself, since weeks without a
+    maintained row (and max-lift recomputation) read the current workouts.
+    """
+    changes = defaultdict(list)
+    for contribution in removed:
+        changes[contribution.week_start_date].append((-1, contribution))
+    for contribution in added:
+        changes[contribution.week_start_date].append((1, contribution))
+
+    for week_start_date, deltas in changes.items():
+        record = Analytics.objects.select_for_update().filter(
+            user_id=user_id, week_start_date=week_start_date
+        ).first()
+
+        # No maintained row for this week yet: build it from scratch instead
+        if record is None:
+            recompute_week(user_id, week_start_date, user_weight)
+            continue
+
+        rescan_max_lift = False
+        for sign, contribution in deltas:
+            record.workout_count += sign
+            record.total_volume += sign * contribution.volume
+            record.weekly_workout_duration_minutes += sign * contribution.duration
+            record.met_minutes += sign * contribution.met_minutes
+
+            if contribution.is_strength and contribution.weight_used is not None:
+                if sign > 0:
+                    record.max_lift = max(record.max_lift, contribution.weight_used)
+                elif contribution.weight_used >= record.max_lift:
+                    # The removed row may have held the week's max lift
+                    rescan_max_lift = True
+
+        if record.workout_count <= 0:
+            record.delete()
+            continue
+
+        if rescan_max_lift:
+            record.max_lift = weekly_workouts(user_id, week_start_date).filter(
+                strength_condition()
+            ).aggregate(lift=Max('weight_used'))['lift'] or 0
+
+        refresh_derived(record, user_weight)
+        record.save()
+
+
+def weekly_totals_by_user(workouts):
+    """
+    Group `workouts` by user and Monday-based week, computing every weekly metric in one query.
+    """
+    return (
+        workouts.annotate(week=TruncWeek('date'))
+        .order_by() # Keep the model ordering out of the GROUP BY
+        .values('user_id', 'week')
+        .annotate(**weekly_aggregates())
+    )
+
+
+def upsert_analytics(records):
+    """
+    Insert or update Analytics rows in one statement, keyed on the per-user-per-week constraint.
+    """
+    features = connections[router.db_for_write(Analytics)].features
+    return Analytics.objects.bulk_create(
+        records,
+        update_conflicts=True,
+        # MySQL upserts on any unique key and rejects an explicit conflict target
+        unique_fields=['user', 'week_start_date'] if features.supports_update_conflicts_with_target else None,
+        update_fields=[
+            'total_volume', 'max_lift', 'average_intensity', 'strength_level',
+            'total_calories_burned', 'weekly_workout_duration_minutes',
+            'workout_count', 'met_minutes',
+        ],
+    )
+
+
+def user_weights(user_ids):
+    """
+    Map user ids to the body weight used by the analytics formulas.
+    """
+    user_model = Workout._meta.get_field('user').related_model
+    return {
+        pk: float(weight) if weight else DEFAULT_USER_WEIGHT
+        for pk, weight in user_model.objects.filter(pk__in=user_ids).values_list('pk', 'weight')
+    }
+
+
+def rebuild_analytics(workouts, weights):
+    """
+    Recompute and upsert the Analytics rows for every (user, week) present in `workouts`.
+
+    `weights` maps user ids to body weight. Returns the rows written.
+    """
+    records = [
+        Analytics(
+            user_id=row['user_id'],
+            week_start_date=row['week'],
+            **build_analytics_data(row, weights[row['user_id']])
+        )
+        for row in weekly_totals_by_user(workouts)
+    ]
+    if records:
+        upsert_analytics(records)
+    return records
+
+
+def category_weeks(category_id):
+    """
+    (user id, week start) pairs for every week containing workouts of a category.
+    """
+    return list(
+        Workout.objects.filter(category_id=category_id)
+        .annotate(week=TruncWeek('date'))
+        .order_by()
+        .values_list('user_id', 'week')
+        .distinct()
+    )
+
+
+def recompute_weeks(user_weeks):
+    """
+    Rebuild the Analytics rows covering the given (user id, week start) pairs.
+
+    Rows for pairs left without workouts are deleted, as recompute_week does.
+    """
+    if not user_weeks:
+        return []
+
+    user_ids = {user_id for user_id, _ in user_weeks}
+    weeks = [week for _, week in user_weeks]
+    workouts = Workout.objects.filter(
+        user_id__in=user_ids,
+        date__gte=min(weeks),
+        date__lt=max(weeks) + timedelta(days=7),
+    )
+    records = rebuild_analytics(workouts, user_weights(user_ids))
+
+    emptied = set(user_weeks) - {(record.user_id, record.week_start_date) for record in records}
+    if emptied:
+        Analytics.objects.filter(
+            reduce(operator.or_, (Q(user_id=user_id, week_start_date=week) for user_id, week in emptied))
+        ).delete()
+    return records
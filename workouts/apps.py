@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class WorkoutsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'workouts'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from .models import Workout
+        from .signals import track_media
+
+        # Reference-count content-addressed uploads (see workouts.storage)
+        track_media(Workout, 'image')
+        track_media(get_user_model(), 'profile_picture')
@@ -0,0 +1,156 @@
+# workouts/async_views.py
+
+from asgiref.sync import sync_to_async
+from datetime import date
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+    NotFound,
+    ValidationError,
+)
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .analytics import arecompute_week, refresh_derived, user_weight_of, week_start
+from .cache import category_cache
+from .filters import WorkoutFilter
+from .models import Analytics, Workout
+from .pagination import AsyncPageNumberPagination, WorkoutCursorPagination
+from .serializers import AnalyticsRowSerializer, WorkoutRowSerializer, WorkoutSerializer
+from .views import user_workouts
+
+
+async def category_snapshot(category_ids=()):
+    """
+    Load the category catalog off the event loop, so serializers resolve names without a query.
+    """
+    snapshot = await sync_to_async(category_cache.snapshot)()
+    if any(pk is not None and pk not in snapshot.names_by_id for pk in category_ids):
+        # Created by another process since our snapshot was taken
+        category_cache.invalidate_local()
+        snapshot = await sync_to_async(category_cache.snapshot)()
+    return snapshot
+
+
+class AsyncAPIView(View):
+    """
+    Base for read-only async endpoints served natively under ASGI.
+
+    Authenticates the JWT bearer token like JWTAuthentication, but loads the
+    user with the async ORM; handlers receive a DRF Request and return
+    JSON, and DRF API exceptions become JSON error responses.
+    """
+    authentication = JWTAuthentication()
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request)
+        try:
+            request.user = await self.authenticate(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+
+    async def authenticate(self, request):
+        header = self.authentication.get_header(request)
+        raw_token = self.authentication.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            raise NotAuthenticated()
+
+        validated_token = self.authentication.get_validated_token(raw_token)
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        user_model = get_user_model()
+        try:
+            user = await user_model.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+        except user_model.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if jwt_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            jwt_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        return user
+
+    def handle_exception(self, request, exc):
+        data = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+        response = JsonResponse(data, status=exc.status_code, safe=False)
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            response.status_code = 401
+            response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+        return response
+
+
+class AsyncWorkoutListView(AsyncAPIView):
+    """
+    Async variant of the workout list (GET only), with the same filters and pagination.
+    """
+    pagination_class = AsyncPageNumberPagination
+    cursor_pagination_class = WorkoutCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        filterset = WorkoutFilter(request.query_params, queryset=user_workouts(request.user), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        params = request.query_params
+        if params.get('pagination') == 'cursor' or self.cursor_pagination_class.cursor_query_param in params:
+            paginator = self.cursor_pagination_class()
+        else:
+            paginator = self.pagination_class()
+
+        rows = await paginator.apaginate_queryset(filterset.qs.values(*WorkoutRowSerializer.fields), request, view=self)
+        await category_snapshot({row['category_id'] for row in rows})
+
+        serializer = WorkoutRowSerializer(rows, request)
+        return JsonResponse(paginator.get_paginated_response(serializer.data).data)
+
+
+class AsyncWorkoutDetailView(AsyncAPIView):
+    """
+    Async variant of the workout detail endpoint (GET only).
+    """
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            workout = await user_workouts(request.user).aget(pk=pk)
+        except Workout.DoesNotExist:
+            raise NotFound("No Workout matches the given query.")
+        await category_snapshot([workout.category_id])
+
+        serializer = WorkoutSerializer(workout, context={'request': request})
+        return JsonResponse(serializer.data)
+
+
+class AsyncAnalyticsView(AsyncAPIView):
+    """
+    Async variant of the current week's analytics endpoint.
+    """
+    async def get(self, request, *args, **kwargs):
+        user = request.user
+        week_start_date = week_start(date.today())
+        user_weight = user_weight_of(user)
+
+        analytics_record = await Analytics.objects.filter(user=user, week_start_date=week_start_date).afirst()
+
+        if analytics_record is None:
+            await category_snapshot() # Strength workouts are matched by cached category id
+            analytics_record = await arecompute_week(user.pk, week_start_date, user_weight)
+
+        if analytics_record is None:
+            return JsonResponse({"detail": "No workouts found for this week."}, status=404)
+
+        changed_fields = refresh_derived(analytics_record, user_weight)
+        if changed_fields:
+            await analytics_record.asave(update_fields=changed_fields)
+
+        return JsonResponse(AnalyticsRowSerializer(analytics_record).data)
@@ -0,0 +1,155 @@
+# workouts/cache.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from uuid import uuid4
+from django.conf import settings
+from django.db import router
+from django.utils.cache import quote_etag
+from GymLog.caches import shared_cache
+from .models import Category
+
+
+class CategorySnapshot(NamedTuple):
+    """
+    An immutable copy of the Category table.
+    """
+    entries: tuple # (id, name) pairs ordered by id
+    names_by_id: dict
+    ids_by_name: dict
+    etag: str
+
+    @classmethod
+    def load(cls):
+        # From the primary: a snapshot is shared and kept for CATEGORY_CACHE_TIMEOUT, so one read
+        # from a lagging replica would hide new categories from every worker until it expires
+        categories = Category.objects.db_manager(router.db_for_write(Category))
+        entries = tuple(categories.order_by('pk').values_list('pk', 'name'))
+        digest = hashlib.sha1(repr(entries).encode('utf-8')).hexdigest()
+        return cls(
+            entries=entries,
+            names_by_id=dict(entries),
+            ids_by_name={name: pk for pk, name in entries},
+            etag=quote_etag(digest),
+        )
+
+    def categories(self):
+        """
+        Category instances built from the snapshot (no database query).
+        """
+        return [Category(pk=pk, name=name) for pk, name in self.entries]
+
+
+class CategoryCache:
+    """
+    Versioned cache of the Category catalog.
+
+    Each process keeps a small LRU of snapshots keyed by catalog version. When
+    CATEGORY_CACHE_ALIAS names a Django cache, the version and snapshots are
+    shared through it, so an invalidation in one worker is seen by every
+    other worker on its next lookup. Without a shared cache (a process-local
+    alias counts as none), local snapshots expire after CATEGORY_CACHE_TIMEOUT
+    seconds, so analytics that get stored do not rely on them.
+    """
+    version_key = 'workouts:categories:version'
+    snapshot_key = 'workouts:categories:{version}'
+    maxsize = 4
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = OrderedDict() # version -> (expires_at, snapshot)
+        self._local_version = uuid4().hex
+
+    @property
+    def shared(self):
+        return shared_cache(getattr(settings, 'CATEGORY_CACHE_ALIAS', None))
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'CATEGORY_CACHE_TIMEOUT', 300)
+
+    def version(self):
+        """
+        Current catalog version, shared across processes when a shared cache is configured.
+        """
+        shared = self.shared
+        if shared is None:
+            return self._local_version
+
+        version = shared.get(self.version_key)
+        if version is None:
+            # First use or evicted: start a new version without clobbering a concurrent one
+            shared.add(self.version_key, uuid4().hex, timeout=None)
+            version = shared.get(self.version_key)
+        return version
+
+    def snapshot(self):
+        """
+        The catalog for the current version, loading it from the shared cache or database on a miss.
+        """
+        version = self.version()
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._local.get(version)
+            if cached is not None and cached[0] > now:
+                self._local.move_to_end(version)
+                return cached[1]
+
+        shared = self.shared
+        snapshot = None
+        if shared is not None:
+            snapshot = shared.get(self.snapshot_key.format(version=version))
+        if snapshot is None:
+            snapshot = CategorySnapshot.load()
+            if shared is not None:
+                shared.set(self.snapshot_key.format(version=version), snapshot, self.timeout)
+
+        with self._lock:
+            self._local[version] = (now + self.timeout, snapshot)
+            self._local.move_to_end(version)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+        return snapshot
+
+    def invalidate(self):
+        """
+        Start a new catalog version; call after a category write commits.
+        """
+        with self._lock:
+            self._local.clear()
+            self._local_version = uuid4().hex
+
+        shared = self.shared
+        if shared is not None:
+            shared.set(self.version_key, uuid4().hex, timeout=None)
+
+    def name_for(self, category_id):
+        """
+        Name of a category by id, or None.
+        """
+        if category_id is None:
+            return None
+
+        name = self.snapshot().names_by_id.get(category_id)
+        if name is None:
+            # Possibly created by another process since our snapshot was taken
+            self.invalidate_local()
+            name = self.snapshot().names_by_id.get(category_id)
+        return name
+
+    def id_for(self, name):
+        """
+        Id of a category by name, or None.
+        """
+        return self.snapshot().ids_by_name.get(name)
+
+    def invalidate_local(self):
+        with self._lock:
+            self._local.clear()
+
+
+category_cache = CategoryCache()
@@ -0,0 +1,56 @@
+# workouts/conditional.py
+
+import hashlib
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """
+    Strong ETag derived from the given values.
+    """
+    return quote_etag(hashlib.sha1(repr(parts).encode('utf-8')).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET/HEAD with 304 Not Modified when the client's If-None-Match or
+    If-Modified-Since matches, before the response is built or serialized.
+
+    Views implement get_validators(), returning (etag, last_modified) where
+    either may be None. Unconditional requests pay for it too, so derive the
+    validators from data the response reads anyway (kept on the view for the
+    response to reuse) or from at most one small query. Generic views get
+    this from get(); views defining their own get() call
+    not_modified_response() first and with_validators() on the result.
+    """
+    def get_validators(self):
+        return None, None
+
+    def validators(self):
+        if not hasattr(self, '_validators'):
+            etag, last_modified = self.get_validators()
+            timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+            self._validators = etag, timestamp
+        return self._validators
+
+    def not_modified_response(self, request):
+        etag, timestamp = self.validators()
+        if etag is None and timestamp is None:
+            return None
+        return get_conditional_response(request._request, etag=etag, last_modified=timestamp)
+
+    def with_validators(self, response):
+        if response.status_code == 200:
+            etag, timestamp = self.validators()
+            if etag is not None:
+                response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def get(self, request, *args, **kwargs):
+        not_modified = self.not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+        return self.with_validators(super().get(request, *args, **kwargs))
@@ -0,0 +1,72 @@
+# workouts/exercises.py
+
+from django.db.models import Exists, OuterRef
+from .models import Exercise, Workout
+
+
+def exercise_key(name):
+    """
+    Normalized exercise name: surrounding and repeated whitespace removed, lower-cased.
+    """
+    return ' '.join(name.split()).lower()
+
+
+def exercise_ids_for(names):
+    """
+    Catalog ids for exercise names, keyed by normalized name; missing exercises are added.
+
+    Costs one query when every exercise exists, three otherwise.
+    """
+    display_names = {}
+    for name in names:
+        display_names.setdefault(exercise_key(name), ' '.join(name.split()))
+
+    ids = dict(
+        Exercise.objects.filter(normalized_name__in=display_names).values_list('normalized_name', 'pk')
+    )
+    missing = [
+        Exercise(name=display_name, normalized_name=key)
+        for key, display_name in display_names.items() if key not in ids
+    ]
+    if missing:
+        # Another request may add the same exercise concurrently; the unique key keeps one
+        Exercise.objects.bulk_create(missing, ignore_conflicts=True)
+        ids.update(
+            Exercise.objects.filter(
+                normalized_name__in=[exercise.normalized_name for exercise in missing]
+            ).values_list('normalized_name', 'pk')
+        )
+    return ids
+
+
+def exercise_id_for(name):
+    """
+    Catalog id for one exercise name, adding the exercise if needed.
+    """
+    return exercise_ids_for([name])[exercise_key(name)]
+
+
+def search_exercises(term, user_id):
+    """
+    Catalog entries the user has logged whose normalized name starts with `term`.
+
+    The catalog is shared by every user and grows with every spelling, so
+    it is only ever matched by prefix (`LIKE 'x%'`), a range scan on the
+    normalized name index; a substring match would read the whole catalog.
+    Entries are limited to the user's own exercises (an existence check on
+    the per-user exercise index), so names typed only by other users are
+    never listed.
+    """
+    key = exercise_key(term)
+    if not key:
+        return Exercise.objects.none()
+    return Exercise.objects.filter(normalized_name__startswith=key).filter(
+        Exists(Workout.objects.filter(user_id=user_id, exercise_id=OuterRef('pk')))
+    )
+
+
+def matching_exercise_ids(term):
+    """
+    Ids of catalog entries whose normalized name starts with `term`, as a subquery.
+    """
+    return Exercise.objects.filter(normalized_name__startswith=exercise_key(term)).values('pk')
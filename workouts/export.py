@@ -0,0 +1,101 @@
+# workouts/export.py
+
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+from .cache import category_cache
+from .pagination import WORKOUT_KEYSET_ORDERING, workouts_after
+
+# Columns written for each exported workout, in order
+EXPORT_FIELDS = (
+    'id', 'date', 'exercise_name', 'category', 'weight_used', 'reps', 'sets',
+    'workout_duration_minutes', 'notes',
+)
+
+_QUERY_FIELDS = (
+    'id', 'date', 'exercise_name', 'category_id', 'weight_used', 'reps', 'sets',
+    'workout_duration_minutes', 'notes',
+)
+
+
+def iter_export_rows(workouts, chunk_size=2000):
+    """
+    Yield export rows (dicts keyed by EXPORT_FIELDS) for a workout queryset.
+
+    Rows are read in keyset-ordered chunks, so memory stays constant
+    regardless of history size on every backend.
+
+    QuerySet.iterator(chunk_size=...) would not: mysqlclient's default
+    cursor buffers the whole result set client-side, and on PostgreSQL the
+    server-side cursor it uses holds one transaction and connection open for
+    the whole (slow, client-paced) download, which DB_POOL and transaction-
+    pooling proxies cannot allow. Each chunk here is a short, indexed query.
+    """
+    queryset = workouts.order_by(*WORKOUT_KEYSET_ORDERING).values_list(*_QUERY_FIELDS)
+    position = None
+
+    while True:
+        chunk = queryset if position is None else queryset.filter(workouts_after(position))
+        rows = list(chunk[:chunk_size])
+
+        for row in rows:
+            record = dict(zip(EXPORT_FIELDS, row))
+            record['category'] = category_cache.name_for(record['category'])
+            yield record
+
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]
+        position = (last[1], last[2], last[0])
+
+
+class _Echo:
+    """
+    File-like object whose write() returns the value, for streaming csv.writer output.
+    """
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renders workout export rows as CSV.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def stream(self, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow(row[field] for field in EXPORT_FIELDS)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Used for error responses; exports are streamed through stream()
+        if data is None:
+            return b''
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        writer = csv.writer(_Echo())
+        return ''.join(writer.writerow([key, value]) for key, value in data.items()).encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders workout export rows as newline-delimited JSON.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def stream(self, rows):
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Used for error responses; exports are streamed through stream()
+        if data is None:
+            return b''
+        return (json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode(self.charset)
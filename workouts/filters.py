@@ -1,4 +1,5 @@
 import django_filters
+from .exercises import matching_exercise_ids
 from .models import Workout
 
 class WorkoutFilter(django_filters.FilterSet):
@@ -7,9 +8,14 @@ class WorkoutFilter(django_filters.FilterSet):
     date_after = django_filters.DateFilter(field_name='date', lookup_expr='gte')
     date_before = django_filters.DateFilter(field_name='date', lookup_expr='lte')
     
-    # Allow case-insensitive search on exercise name
-    exercise_name = django_filters.CharFilter(field_name='exercise_name', lookup_expr='icontains')
+    # Allow case-insensitive prefix search on exercise name, matched against the exercise catalog
+    # (an indexed prefix lookup) so workouts are filtered by an integer join rather than a LIKE scan
+    exercise_name = django_filters.CharFilter(method='filter_exercise_name')
+    exercise = django_filters.NumberFilter(field_name='exercise_id')
     
     class Meta:
         model = Workout
-        fields = ['date', 'date_after', 'date_before', 'exercise_name']
\ No newline at end of file
+        fields = ['date', 'date_after', 'date_before', 'exercise_name', 'exercise']
+
+    def filter_exercise_name(self, queryset, name, value):
+        return queryset.filter(exercise_id__in=matching_exercise_ids(value))
\ No newline at end of file
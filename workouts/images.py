@@ -0,0 +1,150 @@
+# workouts/images.py
+
+import logging
+import posixpath
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+from .storage import is_content_addressed
+
+logger = logging.getLogger(__name__)
+
+# Renditions generated for every uploaded image: name -> bounding box in pixels
+RENDITION_SIZES = {
+    'thumbnail': (160, 160),
+    'medium': (640, 640),
+}
+
+# Output formats: file extension -> Pillow format name
+RENDITION_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+RENDITIONS_DIR = 'renditions' # Stored alongside originals under MEDIA_ROOT/renditions/
+
+_RENDITION_NAME = re.compile(
+    r'^%s/(?P<source>.+)_(?:%s)\.(?:%s)$' % (RENDITIONS_DIR, '|'.join(RENDITION_SIZES), '|'.join(RENDITION_FORMATS))
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def rendition_name(name, size, extension):
+    """
+    Storage name of one rendition of the image stored as `name`.
+    """
+    stem, _ = posixpath.splitext(name)
+    return f"{RENDITIONS_DIR}/{stem}_{size}.{extension}"
+
+
+def is_immutable_media(name):
+    """
+    Whether a media name is a content-addressed upload or a rendition of one.
+    """
+    match = _RENDITION_NAME.match(name)
+    return is_content_addressed(match['source'] if match else name)
+
+
+def rendition_urls(field_file, request=None):
+    """
+    URLs of every rendition of an image field, keyed by size then format.
+
+    Renditions are produced shortly after upload, so clients should fall back
+    to the original image if one is not available yet.
+    """
+    if not field_file:
+        return None
+
+    urls = {}
+    for size in RENDITION_SIZES:
+        urls[size] = {}
+        for extension in RENDITION_FORMATS:
+            url = field_file.storage.url(rendition_name(field_file.name, size, extension))
+            urls[size][extension] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def generate_renditions(name, storage=None):
+    """
+    Create (or replace) every rendition of the stored image `name`.
+    """
+    storage = storage or default_storage
+    largest = max(RENDITION_SIZES.values())
+
+    if is_content_addressed(name) and all(
+        storage.exists(rendition_name(name, size, extension))
+        for size in RENDITION_SIZES for extension in RENDITION_FORMATS
+    ):
+        return # A blob's content never changes, so neither do its renditions
+
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        # Let the JPEG decoder downscale while decoding instead of inflating the full image
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    for size, box in RENDITION_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail(box, Image.Resampling.LANCZOS)
+
+        for extension, pil_format in RENDITION_FORMATS.items():
+            output = resized
+            if pil_format == 'JPEG' and output.mode != 'RGB':
+                output = output.convert('RGB')
+            elif pil_format == 'WEBP' and output.mode not in ('RGB', 'RGBA'):
+                output = output.convert('RGBA')
+
+            buffer = BytesIO()
+            output.save(buffer, pil_format, quality=80)
+
+            target = rendition_name(name, size, extension)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def _generate_logged(name, storage):
+    try:
+        generate_renditions(name, storage)
+    except Exception:
+        logger.exception("Could not generate renditions for %s", name)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_RENDITION_WORKERS,
+                thread_name_prefix='image-renditions',
+            )
+        return _executor
+
+
+def schedule_renditions(field_file):
+    """
+    Generate renditions for a just-saved image off the request thread, once the transaction commits.
+
+    With IMAGE_RENDITION_WORKERS = 0 renditions are generated inline instead.
+    """
+    if not field_file:
+        return
+
+    name, storage = field_file.name, field_file.storage
+
+    def submit():
+        if settings.IMAGE_RENDITION_WORKERS:
+            _get_executor().submit(_generate_logged, name, storage)
+        else:
+            _generate_logged(name, storage)
+
+    transaction.on_commit(submit)
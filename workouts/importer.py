@@ -0,0 +1,81 @@
+# workouts/importer.py
+
+import csv
+from itertools import islice
+from django.db import transaction
+from .analytics import recompute_weeks, week_start
+from .exercises import exercise_ids_for, exercise_key
+from .models import Category, Workout
+from .records import RecordEntry, apply_personal_records
+from .serializers import WorkoutImportSerializer
+
+REQUIRED_COLUMNS = {'date', 'exercise_name'}
+MAX_REPORTED_ERRORS = 100 # Keep the error report bounded for very large files
+
+
+class WorkoutImportError(ValueError):
+    """
+    Raised when a CSV file cannot be imported at all (e.g. missing columns).
+    """
+
+
+def import_workouts_csv(user, stream, batch_size=1000):
+    """
+    Import workouts for `user` from a CSV text stream.
+
+    The file is read row by row; each batch resolves its category and
+    exercise names in bulk, validates rows with the WorkoutSerializer rules
+    and is written with bulk_create. Invalid rows are skipped and reported
+    by line number.
+    Personal records are updated per batch and analytics for every
+    affected week are rebuilt once at the end.
+
+    Columns match the export format: date, exercise_name, category,
+    weight_used, reps, sets, workout_duration_minutes, notes (others are ignored).
+    """
+    reader = csv.DictReader(stream)
+    columns = {name.strip() for name in reader.fieldnames or () if name}
+    missing = REQUIRED_COLUMNS - columns
+    if missing:
+        raise WorkoutImportError(f"Missing required column(s): {', '.join(sorted(missing))}.")
+
+    created = skipped = 0
+    errors = []
+    touched_weeks = set()
+    rows = enumerate(reader, start=2) # Line 1 is the header
+
+    with transaction.atomic():
+        while batch := list(islice(rows, batch_size)):
+            # Blank cells mean "not provided", so model defaults and nullability apply
+            batch = [
+                (line, {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()})
+                for line, row in batch
+            ]
+
+            names = {row['category'] for _, row in batch if 'category' in row}
+            category_ids = dict(Category.objects.filter(name__in=names).values_list('name', 'pk'))
+
+            valid_rows = []
+            for line, row in batch:
+                serializer = WorkoutImportSerializer(data=row, context={'category_ids': category_ids})
+                if serializer.is_valid():
+                    valid_rows.append(serializer.validated_data)
+                    continue
+
+                skipped += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line, 'errors': serializer.errors})
+
+            exercise_ids = exercise_ids_for(attrs['exercise_name'] for attrs in valid_rows)
+            workouts = [
+                Workout(user_id=user.pk, exercise_id=exercise_ids[exercise_key(attrs['exercise_name'])], **attrs)
+                for attrs in valid_rows
+            ]
+            Workout.objects.bulk_create(workouts)
+            apply_personal_records(user.pk, added=[RecordEntry.from_workout(workout) for workout in workouts])
+            created += len(workouts)
+            touched_weeks.update(week_start(workout.date) for workout in workouts)
+
+        recompute_weeks({(user.pk, week) for week in touched_weeks})
+
+    return {'created': created, 'skipped': skipped, 'errors': errors}
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from workouts.analytics import DEFAULT_USER_WEIGHT, rebuild_analytics, week_start
+from workouts.models import Analytics, Workout
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute weekly Analytics rows for all users from their workouts, in batches of users, "
+        "deleting rows for weeks that no longer have workouts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Number of users per grouped query")
+        parser.add_argument('--from', dest='date_from', help="Only weeks on or after this date (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='date_to', help="Only weeks on or before this date (YYYY-MM-DD)")
+
+    def handle(self, *args, batch_size, date_from, date_to, **options):
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        workouts = Workout.objects.all()
+        stored = Analytics.objects.all()
+        if date_from:
+            first_week = week_start(self.parse(date_from, '--from'))
+            workouts = workouts.filter(date__gte=first_week)
+            stored = stored.filter(week_start_date__gte=first_week)
+        if date_to:
+            last_week = week_start(self.parse(date_to, '--to'))
+            workouts = workouts.filter(date__lt=last_week + timedelta(days=7))
+            stored = stored.filter(week_start_date__lte=last_week)
+
+        users = get_user_model().objects.order_by('pk')
+        last_pk = 0
+        total_users = total_weeks = total_deleted = 0
+
+        # Walk users by primary key so each batch is one indexed range scan
+        while True:
+            batch = list(users.filter(pk__gt=last_pk).values_list('pk', 'weight')[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+
+            weights = {pk: float(weight) if weight else DEFAULT_USER_WEIGHT for pk, weight in batch}
+
+            with transaction.atomic():
+                records = rebuild_analytics(workouts.filter(user_id__in=weights), weights)
+
+                # Rows in the range whose week has no workouts left (all deleted) are stale
+                rebuilt = {(record.user_id, record.week_start_date) for record in records}
+                stale = [
+                    pk for pk, user_id, week in
+                    stored.filter(user_id__in=weights).values_list('pk', 'user_id', 'week_start_date')
+                    if (user_id, week) not in rebuilt
+                ]
+                if stale:
+                    Analytics.objects.filter(pk__in=stale).delete()
+
+            total_users += len(batch)
+            total_weeks += len(records)
+            total_deleted += len(stale)
+            self.stdout.write(f"Processed {total_users} users, {total_weeks} weeks, {total_deleted} deleted")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {total_weeks} weekly analytics rows for {total_users} users "
+            f"and deleted {total_deleted} rows for weeks without workouts."
+        ))
+
+    def parse(self, value, option):
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise CommandError(f"{option} must be a date in YYYY-MM-DD format.")
+        return parsed
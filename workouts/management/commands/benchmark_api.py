@@ -0,0 +1,240 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+from django.test.client import encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from workouts.analytics import recompute_weeks, week_start
+from workouts.models import Workout
+from workouts.records import RecordEntry, apply_personal_records
+
+BOUNDARY = 'BenchmarkBoundary'
+BULK_SIZE = 500 # Workouts per bulk_create request, the endpoint's maximum
+
+
+def json_body(data):
+    return json.dumps(data).encode('utf-8'), 'application/json'
+
+
+def multipart_body(data):
+    return encode_multipart(BOUNDARY, data), f'multipart/form-data; boundary={BOUNDARY}'
+
+
+def bulk_workouts(count):
+    return [
+        {'exercise_name': 'Bench Press', 'weight_used': '60', 'reps': 5, 'sets': 3, 'date': str(date.today()), 'notes': 'benchmark'}
+        for _ in range(count)
+    ]
+
+
+# name -> function(session) returning (method, path, body, content type); sessions carry a user's tokens
+SCENARIOS = {
+    'list': lambda s: ('GET', '/api/workouts/', None, None),
+    'list_filtered': lambda s: (
+        'GET', f"/api/workouts/?exercise_name=squat&date_after={date.today() - timedelta(weeks=26)}", None, None,
+    ),
+    'list_cursor': lambda s: ('GET', '/api/workouts/?pagination=cursor', None, None),
+    'list_browser': lambda s: ('GET', '/api/workouts/', None, None),
+    'detail': lambda s: ('GET', f"/api/workouts/{s['workout_id']}/", None, None),
+    'create': lambda s: ('POST', '/api/workouts/', *multipart_body({
+        'exercise_name': 'Bench Press', 'weight_used': '60', 'reps': '5', 'sets': '3',
+        'date': str(date.today()), 'notes': 'benchmark',
+    })),
+    'bulk_create': lambda s: ('POST', '/api/workouts/bulk/', *json_body(bulk_workouts(BULK_SIZE))),
+    'analytics': lambda s: ('GET', '/api/workouts/analytics/', None, None),
+    'analytics_history': lambda s: ('GET', '/api/workouts/analytics/history/', None, None),
+    'login': lambda s: ('POST', '/api/users/login/', *json_body({'email': s['email'], 'password': s['password']})),
+    'refresh': lambda s: ('POST', '/api/users/token/refresh/', *json_body({'refresh': s['refresh']})),
+    'async_list': lambda s: ('GET', '/api/workouts/async/', None, None),
+    'async_detail': lambda s: ('GET', f"/api/workouts/async/{s['workout_id']}/", None, None),
+    'async_analytics': lambda s: ('GET', '/api/workouts/async/analytics/', None, None),
+}
+
+# Workouts written per request, for scenarios compared by workout throughput
+SCENARIO_WORKOUTS = {'create': 1, 'bulk_create': BULK_SIZE}
+
+# Extra request headers per scenario
+BROWSER_ACCEPT = 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
+SCENARIO_HEADERS = {
+    'list_browser': {'Accept': BROWSER_ACCEPT}, # What a browser (or a careless client) sends
+}
+
+
+class ClientDriver:
+    """
+    Sends requests through the Django test client, in this process, counting queries on every database.
+    """
+    def __init__(self):
+        self.client = Client(SERVER_NAME='localhost') # Must be in ALLOWED_HOSTS
+
+    def send(self, method, path, body=None, content_type=None, token=None, headers=None):
+        headers = dict(headers or {})
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        with ExitStack() as stack:
+            # Every alias, so reads sent to replicas are counted too
+            captured = [stack.enter_context(CaptureQueriesContext(alias)) for alias in connections.all()]
+            start = time.perf_counter()
+            response = self.client.generic(method, path, body or b'', content_type or 'application/octet-stream', headers=headers)
+            elapsed = time.perf_counter() - start
+        return response.status_code, elapsed, sum(len(queries) for queries in captured), response.content
+
+
+class HTTPDriver:
+    """
+    Sends requests to a running server over HTTP (query counts are not available).
+    """
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, method, path, body=None, content_type=None, token=None, headers=None):
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers or {}, method=method)
+        if content_type:
+            request.add_header('Content-Type', content_type)
+        if token:
+            request.add_header('Authorization', f'Bearer {token}')
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                status, content = response.status, response.read()
+        except urllib.error.HTTPError as error:
+            status, content = error.code, error.read()
+        return status, time.perf_counter() - start, None, content
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark API endpoints as seeded users (see seed_workouts), reporting latency "
+        "percentiles, throughput and queries per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Timed requests per scenario")
+        parser.add_argument('--warmup', type=int, default=10, help="Untimed requests per scenario")
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma-separated scenarios to run")
+        parser.add_argument('--url', help="Base URL of a running server; defaults to the in-process test client")
+        parser.add_argument('--concurrency', type=int, default=1, help="Parallel requests (only with --url)")
+        parser.add_argument('--prefix', default='bench', help="Username prefix of the seeded users")
+        parser.add_argument('--password', default='bench-pass-123', help="Password of the seeded users")
+        parser.add_argument('--users', type=int, default=20, help="Number of seeded users to rotate through")
+
+    def handle(self, *args, requests, warmup, scenarios, url, concurrency, prefix, password, users, **options):
+        names = [name.strip() for name in scenarios.split(',') if name.strip()]
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}. Choose from {', '.join(SCENARIOS)}.")
+        if requests < 2 or concurrency < 1:
+            raise CommandError("--requests must be at least 2 and --concurrency positive.")
+        if concurrency > 1 and not url:
+            raise CommandError("--concurrency needs --url; the test client runs requests one at a time.")
+
+        self.driver = HTTPDriver(url) if url else ClientDriver()
+        sessions = self.log_in(prefix, password, users)
+        self.created = []
+        self.bulk_created = []
+
+        self.stdout.write(
+            f"{'scenario':<18} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'req/s':>8} {'queries':>8}"
+        )
+        try:
+            for name in names:
+                self.run(name, sessions, warmup, requests, concurrency)
+        finally:
+            self.clean_up()
+
+    def log_in(self, prefix, password, count):
+        emails = list(
+            get_user_model().objects.filter(username__startswith=prefix).order_by('pk').values_list('email', flat=True)[:count]
+        )
+        if not emails:
+            raise CommandError(f'No users prefixed "{prefix}"; run seed_workouts first.')
+
+        sessions = []
+        for email in emails:
+            status, _, _, content = self.driver.send(
+                'POST', '/api/users/login/', *json_body({'email': email, 'password': password})
+            )
+            if status != 200:
+                raise CommandError(f"Could not log in as {email} (HTTP {status}).")
+            tokens = json.loads(content)
+            session = {'email': email, 'password': password, 'access': tokens['access'], 'refresh': tokens['refresh']}
+
+            status, _, _, content = self.driver.send('GET', '/api/workouts/', token=session['access'])
+            results = json.loads(content)['results'] if status == 200 else []
+            session['workout_id'] = results[0]['id'] if results else 0
+            sessions.append(session)
+        return sessions
+
+    def send(self, name, session):
+        method, path, body, content_type = SCENARIOS[name](session)
+        status, elapsed, queries, content = self.driver.send(
+            method, path, body, content_type, session['access'], SCENARIO_HEADERS.get(name)
+        )
+        if name == 'create' and status == 201:
+            self.created.append((session, json.loads(content)['id']))
+        elif name == 'bulk_create' and status == 201:
+            self.bulk_created.extend(workout['id'] for workout in json.loads(content))
+        return status, elapsed, queries
+
+    def run(self, name, sessions, warmup, requests, concurrency):
+        for index in range(warmup):
+            self.send(name, sessions[index % len(sessions)])
+
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(concurrency) as pool:
+                results = list(pool.map(lambda index: self.send(name, sessions[index % len(sessions)]), range(requests)))
+        else:
+            results = [self.send(name, sessions[index % len(sessions)]) for index in range(requests)]
+        wall = time.perf_counter() - start
+
+        errors = sum(1 for status, _, _ in results if status >= 400)
+        cuts = statistics.quantiles([elapsed * 1000 for _, elapsed, _ in results], n=100, method='inclusive')
+        queries = [count for _, _, count in results if count is not None]
+        mean_queries = f'{statistics.mean(queries):.1f}' if queries else '-'
+        self.stdout.write(
+            f"{name:<18} {requests:>8} {errors:>6} {cuts[49]:>8.2f} {cuts[94]:>8.2f} {cuts[98]:>8.2f} "
+            f"{requests / wall:>8.1f} {mean_queries:>8}"
+        )
+        if name in SCENARIO_WORKOUTS:
+            self.stdout.write(f"{'':<18} {requests * SCENARIO_WORKOUTS[name] / wall:.1f} workouts/s")
+
+    def clean_up(self):
+        """
+        Delete workouts created by the create scenario through the API, so analytics and records follow.
+        """
+        for session, workout_id in self.created:
+            self.driver.send('DELETE', f'/api/workouts/{workout_id}/', token=session['access'])
+        if self.created:
+            self.stdout.write(f"Deleted {len(self.created)} benchmark workouts.")
+        if self.bulk_created:
+            self.delete_bulk_created()
+
+    def delete_bulk_created(self, batch_size=2000):
+        """
+        Delete bulk-created workouts directly (one request each would outlast the benchmark),
+        then rebuild the analytics weeks and personal records they touched (deleting weeks and
+        records left without workouts).
+        """
+        for start in range(0, len(self.bulk_created), batch_size):
+            ids = self.bulk_created[start:start + batch_size]
+            with transaction.atomic():
+                workouts = list(Workout.objects.filter(pk__in=ids))
+                Workout.objects.filter(pk__in=ids).delete()
+                recompute_weeks({(workout.user_id, week_start(workout.date)) for workout in workouts})
+                entries = defaultdict(list)
+                for workout in workouts:
+                    entries[workout.user_id].append(RecordEntry.from_workout(workout))
+                for user_id, removed in entries.items():
+                    apply_personal_records(user_id, removed=removed)
+        self.stdout.write(f"Deleted {len(self.bulk_created)} bulk-created benchmark workouts.")
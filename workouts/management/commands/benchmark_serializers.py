@@ -0,0 +1,78 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from GymLog.renderers import ORJSONRenderer
+from workouts.models import Analytics, Workout
+from workouts.serializers import (
+    AnalyticsRowSerializer,
+    AnalyticsSerializer,
+    WorkoutRowSerializer,
+    WorkoutSerializer,
+)
+from workouts.views import WORKOUT_API_FIELDS
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-row serialization and rendering cost of the full and lean workout/analytics "
+        "serializers, after checking that they produce identical output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help="Rows serialized per run")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement (best is reported)")
+
+    def handle(self, *args, rows, repeat, **options):
+        if rows < 1 or repeat < 1:
+            raise CommandError("--rows and --repeat must be positive.")
+
+        request = RequestFactory().get('/api/workouts/', SERVER_NAME='localhost')
+        workout_ids = list(Workout.objects.order_by('-pk').values_list('pk', flat=True)[:rows])
+        if not workout_ids:
+            raise CommandError("No workouts to serialize; run seed_workouts first.")
+        workouts = Workout.objects.filter(pk__in=workout_ids).order_by('-pk')
+        records = list(Analytics.objects.order_by('-pk')[:rows])
+
+        cases = [
+            (
+                'workouts',
+                len(workout_ids),
+                lambda: WorkoutSerializer(
+                    list(workouts.only(*WORKOUT_API_FIELDS)), many=True,
+                    context={'request': request},
+                ).data,
+                lambda: WorkoutRowSerializer(list(workouts.values(*WorkoutRowSerializer.fields)), request).data,
+            ),
+            (
+                'analytics',
+                len(records),
+                lambda: AnalyticsSerializer(records, many=True).data,
+                lambda: AnalyticsRowSerializer(records, many=True).data,
+            ),
+        ]
+
+        self.stdout.write(f"{'case':<12} {'rows':>6} {'full us/row':>12} {'lean us/row':>12} {'json us/row':>12} {'orjson us/row':>14}")
+        for name, count, full, lean in cases:
+            if not count:
+                continue
+            full_data, lean_data = full(), lean()
+            if [dict(row) for row in full_data] != lean_data:
+                raise CommandError(f"Lean {name} serializer output differs from the full serializer.")
+            if JSONRenderer().render(full_data) != ORJSONRenderer().render(lean_data):
+                raise CommandError(f"ORJSONRenderer output differs from JSONRenderer for {name}.")
+
+            per_row = lambda function: self.best(function, repeat) / count * 1e6
+            self.stdout.write(
+                f"{name:<12} {count:>6} {per_row(full):>12.1f} {per_row(lean):>12.1f} "
+                f"{per_row(lambda: JSONRenderer().render(lean_data)):>12.2f} "
+                f"{per_row(lambda: ORJSONRenderer().render(lean_data)):>14.2f}"
+            )
+
+    def best(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+# server -> (command line after `python -m`, scenarios it serves natively)
+SERVERS = {
+    'wsgi': (
+        lambda port, workers, threads: [
+            'gunicorn', 'GymLog.wsgi', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+            '--threads', str(threads), '--log-level', 'warning',
+        ],
+        'list,detail,analytics',
+    ),
+    'asgi': (
+        lambda port, workers, threads: [
+            'uvicorn', 'GymLog.asgi:application', '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(workers), '--log-level', 'warning',
+        ],
+        'async_list,async_detail,async_analytics',
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare WSGI (gunicorn, sync views) and ASGI (uvicorn, async views) under the same load on "
+        "the seeded database, by starting each server in turn and running benchmark_api against it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default=','.join(SERVERS), help="Comma-separated servers to compare")
+        parser.add_argument('--port', type=int, default=8765, help="Local port the servers listen on")
+        parser.add_argument('--workers', type=int, default=2, help="Worker processes per server")
+        parser.add_argument('--threads', type=int, default=4, help="Threads per gunicorn worker")
+        parser.add_argument('--requests', type=int, default=500, help="Timed requests per scenario")
+        parser.add_argument('--warmup', type=int, default=20, help="Untimed requests per scenario")
+        parser.add_argument('--concurrency', type=int, default=32, help="Parallel requests")
+        parser.add_argument('--prefix', default='bench', help="Username prefix of the seeded users")
+        parser.add_argument('--password', default='bench-pass-123', help="Password of the seeded users")
+        parser.add_argument('--users', type=int, default=20, help="Number of seeded users to rotate through")
+
+    def handle(self, *args, servers, port, workers, threads, **benchmark_options):
+        names = [name.strip() for name in servers.split(',') if name.strip()]
+        unknown = set(names) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Unknown servers: {', '.join(sorted(unknown))}. Choose from {', '.join(SERVERS)}.")
+
+        url = f'http://127.0.0.1:{port}'
+        for name in names:
+            command, scenarios = SERVERS[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name.upper()}: {workers} workers" + (f" x {threads} threads" if name == 'wsgi' else '')
+            ))
+            server = subprocess.Popen([sys.executable, '-m', *command(port, workers, threads)], env=os.environ.copy())
+            try:
+                self.wait_until_ready(server, url)
+                call_command('benchmark_api', url=url, scenarios=scenarios, stdout=self.stdout, **benchmark_options)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    def wait_until_ready(self, server, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"The server exited with status {server.returncode}.")
+            try:
+                urllib.request.urlopen(url + '/api/workouts/', timeout=1)
+                return
+            except urllib.error.HTTPError:
+                return # Answering, if only with 401
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"The server did not answer on {url} within {timeout} seconds.")
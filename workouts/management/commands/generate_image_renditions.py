@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from workouts.images import generate_renditions
+from workouts.models import Workout
+
+
+class Command(BaseCommand):
+    help = "Generate resized renditions for workout images and profile pictures uploaded before renditions existed."
+
+    def handle(self, *args, **options):
+        sources = [
+            Workout.objects.exclude(image='').exclude(image__isnull=True).order_by().values_list('image', flat=True),
+            get_user_model().objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+            .order_by().values_list('profile_picture', flat=True),
+        ]
+
+        generated = failed = 0
+        for names in sources:
+            for name in names.distinct().iterator():
+                try:
+                    generate_renditions(name)
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{name}: {e}")
+                else:
+                    generated += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Generated renditions for {generated} images ({failed} failed)."))
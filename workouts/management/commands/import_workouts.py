@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from workouts.importer import WorkoutImportError, import_workouts_csv
+
+
+class Command(BaseCommand):
+    help = "Import a CSV workout history for a user (same columns as the export endpoint)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to the CSV file")
+        parser.add_argument('--user', required=True, help="Email of the user the workouts belong to")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows validated and inserted per batch")
+
+    def handle(self, *args, path, user, batch_size, **options):
+        try:
+            owner = get_user_model().objects.get(email=user)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {user}.")
+
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                result = import_workouts_csv(owner, stream, batch_size=batch_size)
+        except (OSError, UnicodeDecodeError, WorkoutImportError) as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            messages = '; '.join(
+                f"{field}: {' '.join(str(message) for message in field_errors)}"
+                for field, field_errors in error['errors'].items()
+            )
+            self.stderr.write(f"Line {error['line']}: {messages}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} workouts, skipped {result['skipped']} invalid rows."
+        ))
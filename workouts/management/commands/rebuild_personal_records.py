@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from workouts.models import PersonalRecord, Workout
+from workouts.exercises import exercise_key
+from workouts.records import RecordEntry, build_records
+
+
+class Command(BaseCommand):
+    help = "Rebuild every user's personal records from their workouts, in batches of users."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Number of users per batch")
+
+    def handle(self, *args, batch_size, **options):
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        users = get_user_model().objects.order_by('pk')
+        last_pk = 0
+        total_users = total_records = 0
+
+        # Walk users by primary key so each batch is one indexed range scan
+        while True:
+            user_ids = list(users.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+            if not user_ids:
+                break
+            last_pk = user_ids[-1]
+
+            rows = Workout.objects.filter(user_id__in=user_ids).order_by('user_id', 'date', 'id').values_list(
+                'user_id', 'exercise_name', 'weight_used', 'reps', 'date'
+            )
+            entries_by_user = {user_id: [] for user_id in user_ids}
+            for user_id, name, weight_used, reps, day in rows:
+                entries_by_user[user_id].append(RecordEntry(exercise_key(name), name, weight_used, reps, day))
+
+            records = [
+                record
+                for user_id, entries in entries_by_user.items()
+                for record in build_records(entries, user_id).values()
+            ]
+
+            with transaction.atomic():
+                PersonalRecord.objects.filter(user_id__in=user_ids).delete()
+                PersonalRecord.objects.bulk_create(records)
+
+            total_users += len(user_ids)
+            total_records += len(records)
+            self.stdout.write(f"Processed {total_users} users, {total_records} records")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total_records} personal records for {total_users} users."))
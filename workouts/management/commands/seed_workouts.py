@@ -0,0 +1,135 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from workouts.analytics import CARDIO_TRAINING, STRENGTH_TRAINING
+from workouts.cache import category_cache
+from workouts.exercises import exercise_ids_for, exercise_key
+from workouts.models import Category, Workout
+
+# (exercise name, starting working weight in kg)
+STRENGTH_EXERCISES = [
+    ('Back Squat', 60), ('Bench Press', 45), ('Deadlift', 80), ('Overhead Press', 30),
+    ('Barbell Row', 40), ('Pull Up', 0), ('Romanian Deadlift', 50), ('Incline Bench Press', 35),
+    ('Front Squat', 45), ('Dumbbell Curl', 10), ('Leg Press', 100), ('Dip', 0),
+]
+# (exercise name, typical duration in minutes)
+CARDIO_EXERCISES = [('Running', 35), ('Cycling', 45), ('Rowing', 20), ('Swimming', 30), ('Jump Rope', 15)]
+
+# Relative chance of training on each weekday, Monday first
+WEEKDAY_WEIGHTS = [1.0, 0.7, 0.9, 0.7, 0.8, 0.5, 0.3]
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic users, categories and workouts for load testing and benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help="Number of users to create")
+        parser.add_argument('--workouts-per-user', type=int, default=200, help="Average workouts per user")
+        parser.add_argument('--weeks', type=int, default=104, help="Weeks of history, ending today")
+        parser.add_argument('--prefix', default='bench', help="Username prefix of the generated users")
+        parser.add_argument('--password', default='bench-pass-123', help="Password of every generated user")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for reproducible data")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Workouts per INSERT")
+        parser.add_argument('--skip-derived', action='store_true', help="Don't build analytics and personal records")
+
+    def handle(self, *args, users, workouts_per_user, weeks, prefix, password, seed, batch_size, skip_derived, **options):
+        if min(users, workouts_per_user, weeks, batch_size) < 1:
+            raise CommandError("--users, --workouts-per-user, --weeks and --batch-size must be positive.")
+
+        User = get_user_model()
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Users prefixed "{prefix}" already exist; choose another --prefix.')
+
+        rng = random.Random(seed)
+        category_ids = self.ensure_categories()
+        exercise_ids = exercise_ids_for(name for name, _ in STRENGTH_EXERCISES + CARDIO_EXERCISES)
+
+        # Hashing is deliberately slow, so every generated user shares one hash
+        password_hash = make_password(password)
+        user_ids = [
+            user.pk for user in User.objects.bulk_create([
+                User(
+                    username=f'{prefix}{n}', email=f'{prefix}{n}@example.com', password=password_hash,
+                    weight=Decimal(rng.randint(55, 110)), height=Decimal(rng.randint(155, 200)),
+                )
+                for n in range(users)
+            ])
+        ]
+        if None in user_ids:
+            # Backends without RETURNING leave primary keys unset on bulk_create
+            user_ids = list(User.objects.filter(username__startswith=prefix).order_by('pk').values_list('pk', flat=True))
+
+        last_day = date.today()
+        first_day = last_day - timedelta(weeks=weeks)
+        pending = []
+        total = 0
+        for user_id in user_ids:
+            pending.extend(self.user_workouts(rng, user_id, workouts_per_user, first_day, last_day, category_ids, exercise_ids))
+            while len(pending) >= batch_size:
+                total += self.flush(pending[:batch_size])
+                del pending[:batch_size]
+                self.stdout.write(f"Inserted {total} workouts")
+        total += self.flush(pending)
+
+        self.stdout.write(self.style.SUCCESS(f"Created {len(user_ids)} users and {total} workouts."))
+
+        if not skip_derived:
+            call_command('backfill_analytics', stdout=self.stdout)
+            call_command('rebuild_personal_records', stdout=self.stdout)
+
+    def ensure_categories(self):
+        for name in (STRENGTH_TRAINING, CARDIO_TRAINING):
+            Category.objects.get_or_create(name=name)
+        category_cache.invalidate()
+        return {name: category_cache.id_for(name) for name in (STRENGTH_TRAINING, CARDIO_TRAINING)}
+
+    def user_workouts(self, rng, user_id, average, first_day, last_day, category_ids, exercise_ids):
+        """
+        One user's workouts: sessions of 3-5 exercises, denser in recent weeks
+        and on preferred weekdays, with strength progressing over time.
+        """
+        span = (last_day - first_day).days
+        count = max(1, int(rng.gauss(average, average / 4)))
+        strength = rng.sample(STRENGTH_EXERCISES, 6)
+        cardio = rng.sample(CARDIO_EXERCISES, 2)
+        fitness = rng.uniform(0.7, 1.5) # How strong this user is relative to the base weights
+
+        workouts = []
+        while len(workouts) < count:
+            # Most users log more as they stick with it: skew sessions towards recent dates
+            day = first_day + timedelta(days=int(rng.triangular(0, span, span)))
+            if rng.random() > WEEKDAY_WEIGHTS[day.weekday()]:
+                continue
+            progress = 1 + 0.4 * (day - first_day).days / span
+
+            if rng.random() < 0.2:
+                name, minutes = rng.choice(cardio)
+                workouts.append(Workout(
+                    user_id=user_id, exercise_name=name, exercise_id=exercise_ids[exercise_key(name)],
+                    category_id=category_ids[CARDIO_TRAINING], date=day,
+                    workout_duration_minutes=max(5, int(rng.gauss(minutes, minutes / 5))),
+                ))
+                continue
+
+            for name, base_weight in rng.sample(strength, rng.randint(3, 5)):
+                weight = None
+                if base_weight:
+                    # Round to the nearest 2.5 kg, as loaded on a barbell
+                    weight = Decimal(round(base_weight * fitness * progress * rng.uniform(0.85, 1.05) / 2.5) * 2.5)
+                workouts.append(Workout(
+                    user_id=user_id, exercise_name=name, exercise_id=exercise_ids[exercise_key(name)],
+                    category_id=category_ids[STRENGTH_TRAINING], date=day, weight_used=weight,
+                    reps=rng.choice((3, 5, 5, 6, 8, 8, 10, 12)), sets=rng.randint(3, 5),
+                    workout_duration_minutes=rng.randint(8, 20),
+                ))
+        return workouts[:count]
+
+    def flush(self, workouts):
+        with transaction.atomic():
+            Workout.objects.bulk_create(workouts)
+        return len(workouts)
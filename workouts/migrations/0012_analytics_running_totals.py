@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:17
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, FloatField, Max, Q, Sum, Value, When
+
+
+def populate_running_totals(apps, schema_editor):
+    """
+    Rebuild the running totals of existing Analytics rows from their week's workouts.
+
+    Derived fields (calories, intensity, strength level) are refreshed on the next read.
+    """
+    Analytics = apps.get_model('workouts', 'Analytics')
+    Workout = apps.get_model('workouts', 'Workout')
+    is_strength = Q(category__name="Strength Training")
+
+    for record in Analytics.objects.all().iterator():
+        totals = Workout.objects.filter(
+            user_id=record.user_id,
+            date__gte=record.week_start_date,
+            date__lt=record.week_start_date + timedelta(days=7),
+        ).aggregate(
+            workout_count=Count('id'),
+            total_volume=Sum(F('weight_used') * F('reps') * F('sets'), filter=is_strength),
+            max_lift=Max('weight_used', filter=is_strength),
+            duration=Sum('workout_duration_minutes'),
+            met_minutes=Sum(
+                Case(
+                    When(is_strength, then=Value(6.0)),
+                    default=Value(7.0),
+                    output_field=FloatField(),
+                ) * F('workout_duration_minutes'),
+                output_field=FloatField(),
+            ),
+        )
+
+        if not totals['workout_count']:
+            record.delete()
+            continue
+
+        record.workout_count = totals['workout_count']
+        record.total_volume = totals['total_volume'] or 0
+        record.max_lift = totals['max_lift'] or 0
+        record.weekly_workout_duration_minutes = totals['duration'] or 0
+        record.met_minutes = totals['met_minutes'] or 0
+        record.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0011_alter_analytics_week_start_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analytics',
+            name='met_minutes',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='analytics',
+            name='workout_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_running_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:34
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+USER_BATCH_SIZE = 100 # Users whose workouts are read per query
+EPLEY_MAX_REPS = 30
+
+
+def estimated_one_rep_max(weight, reps):
+    """
+    Epley estimate, as workouts.records.estimated_one_rep_max computes it.
+    """
+    if weight is None or not reps:
+        return None
+    if reps == 1:
+        return Decimal(weight)
+    return (Decimal(weight) * (1 + Decimal(min(reps, EPLEY_MAX_REPS)) / 30)).quantize(Decimal('0.01'))
+
+
+def populate_personal_records(apps, schema_editor):
+    """
+    Build personal records from existing workouts, so /records/ is complete without a manual rebuild.
+
+    Follows workouts.records: names are grouped like exercise_key (trimmed,
+    repeated whitespace collapsed, lower-cased) and each user's workouts
+    are folded in date order, so ties credit the first time a best was set
+    and the name comes from the latest record-setting workout.
+    """
+    PersonalRecord = apps.get_model('workouts', 'PersonalRecord')
+    Workout = apps.get_model('workouts', 'Workout')
+
+    user_ids = list(Workout.objects.order_by('user_id').values_list('user_id', flat=True).distinct())
+    for start in range(0, len(user_ids), USER_BATCH_SIZE):
+        rows = Workout.objects.filter(user_id__in=user_ids[start:start + USER_BATCH_SIZE]).order_by(
+            'user_id', 'date', 'id'
+        ).values_list('user_id', 'exercise_name', 'weight_used', 'reps', 'date')
+
+        records = {}
+        for user_id, name, weight, reps, day in rows.iterator():
+            key = ' '.join(name.split()).lower()
+            record = records.get((user_id, key))
+            if record is None:
+                record = records[(user_id, key)] = PersonalRecord(user_id=user_id, exercise_key=key)
+
+            improved = False
+            if weight is not None and (record.max_weight is None or weight > record.max_weight or (
+                weight == record.max_weight and (reps or 0) > (record.max_weight_reps or 0)
+            )):
+                record.max_weight, record.max_weight_reps, record.max_weight_date = weight, reps, day
+                improved = True
+            if reps is not None and (record.best_reps is None or reps > record.best_reps):
+                record.best_reps, record.best_reps_date = reps, day
+                improved = True
+            one_rep_max = estimated_one_rep_max(weight, reps)
+            if one_rep_max is not None and (record.estimated_1rm is None or one_rep_max > record.estimated_1rm):
+                record.estimated_1rm, record.estimated_1rm_date = one_rep_max, day
+                improved = True
+            if improved:
+                record.exercise_name = name
+
+        PersonalRecord.objects.bulk_create(records.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0014_mediablob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonalRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exercise_key', models.CharField(max_length=255)),
+                ('exercise_name', models.CharField(max_length=255)),
+                ('max_weight', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('max_weight_reps', models.PositiveIntegerField(blank=True, null=True)),
+                ('max_weight_date', models.DateField(blank=True, null=True)),
+                ('best_reps', models.PositiveIntegerField(blank=True, null=True)),
+                ('best_reps_date', models.DateField(blank=True, null=True)),
+                ('estimated_1rm', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True)),
+                ('estimated_1rm_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['exercise_key'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'exercise_key'), name='unique_personal_record_per_exercise')],
+            },
+        ),
+        migrations.RunPython(populate_personal_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:35
+
+import django.db.models.deletion
+from collections import defaultdict
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+
+BATCH_SIZE = 2000 # Workouts updated per statement
+
+
+def link_exercises(apps, schema_editor):
+    """
+    Build the catalog from existing workout names and link every workout to its exercise.
+
+    Names are normalized like workouts.exercises.exercise_key: trimmed,
+    repeated whitespace collapsed, lower-cased. exercise_name is not
+    indexed, so workouts are linked in one primary-key ordered pass (one
+    UPDATE per batch) instead of filtering by name once per spelling.
+    """
+    Exercise = apps.get_model('workouts', 'Exercise')
+    Workout = apps.get_model('workouts', 'Workout')
+
+    display_names = {}
+    for name in Workout.objects.order_by().values_list('exercise_name', flat=True).distinct().iterator():
+        display_names.setdefault(' '.join(name.split()).lower(), ' '.join(name.split()))
+    Exercise.objects.bulk_create(
+        [Exercise(name=display_name, normalized_name=key) for key, display_name in display_names.items()],
+        batch_size=BATCH_SIZE,
+    )
+    exercise_ids = dict(Exercise.objects.values_list('normalized_name', 'pk'))
+
+    last_pk = 0
+    while True:
+        batch = list(
+            Workout.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'exercise_name')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        pks_by_exercise = defaultdict(list)
+        for pk, name in batch:
+            pks_by_exercise[exercise_ids[' '.join(name.split()).lower()]].append(pk)
+        # Every workout in the primary key range is in the batch, so one CASE covers them all
+        Workout.objects.filter(pk__gte=batch[0][0], pk__lte=last_pk).update(exercise_id=Case(
+            *[When(pk__in=pks, then=Value(exercise_id)) for exercise_id, pks in pks_by_exercise.items()]
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0015_personalrecord'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Exercise',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('normalized_name', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'ordering': ['normalized_name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='workout',
+            name='exercise',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='workouts', to='workouts.exercise'),
+        ),
+        migrations.RunPython(link_exercises, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='workout',
+            index=models.Index(fields=['user', 'exercise', 'date'], name='workout_user_exercise_date_idx'),
+        ),
+    ]
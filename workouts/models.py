@@ -13,6 +13,21 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class Exercise(models.Model):
+    """
+    Catalog entry for an exercise; workouts whose names differ only in case or spacing share one.
+    """
+    name = models.CharField(max_length=255) # Display name, as first entered (spacing tidied)
+    # Lower-cased, single-spaced. The unique index serves prefix (LIKE 'x%') searches; on PostgreSQL
+    # Django adds a varchar_pattern_ops index for them, since a plain btree only does outside the C locale
+    normalized_name = models.CharField(max_length=255, unique=True)
+
+    class Meta:
+        ordering = ['normalized_name']
+
+    def __str__(self):
+        return self.name
+
 class Workout(models.Model):
     """
     Model for a single workout session entry.
@@ -23,6 +38,13 @@ class Workout(models.Model):
         related_name='workouts'
     )
     exercise_name = models.CharField(max_length=255)
+    exercise = models.ForeignKey(
+        Exercise,
+        on_delete=models.PROTECT, # Catalog entries outlive the workouts that introduced them
+        related_name='workouts',
+        null=True, # Set from exercise_name on every write
+        blank=True
+    )
     weight_used = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True) # e.g., 120.50 kg
 
     reps = models.PositiveIntegerField(null=True, blank=True)
@@ -50,6 +72,13 @@ class Workout(models.Model):
     class Meta:
         ordering = ['-date', 'exercise_name'] # Recent workouts first
 
+        indexes = [
+            # Per-user listing in model order, and the analytics aggregates over a date range
+            models.Index(fields=['user', '-date', 'exercise_name'], name='workout_user_date_name_idx'),
+            # Per-user filtering and aggregation by exercise
+            models.Index(fields=['user', 'exercise', 'date'], name='workout_user_exercise_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username}'s {self.exercise_name} on {self.date}"
 
@@ -76,6 +105,10 @@ class Analytics(models.Model):
     total_calories_burned = models.PositiveIntegerField(default=0)
     weekly_workout_duration_minutes = models.PositiveIntegerField(default=0) 
 
+    # Running totals maintained on workout writes so derived metrics can be refreshed without rescanning the week
+    workout_count = models.PositiveIntegerField(default=0)
+    met_minutes = models.FloatField(default=0) # Sum of (MET × duration) across the week's workouts
+
     class Meta:
         ordering = ['-week_start_date'] # Show most recent analytics first
 
@@ -85,4 +118,49 @@ class Analytics(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.user.username}'s analytics for week starting {self.week_start_date}"
\ No newline at end of file
+        return f"{self.user.username}'s analytics for week starting {self.week_start_date}"
+
+class PersonalRecord(models.Model):
+    """
+    A user's personal bests for one exercise, maintained on workout writes.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='personal_records'
+    )
+    exercise_key = models.CharField(max_length=255) # Normalized exercise name (case and spacing folded)
+    exercise_name = models.CharField(max_length=255) # Name as entered on the most recent record-setting workout
+
+    max_weight = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True) # Heaviest weight_used
+    max_weight_reps = models.PositiveIntegerField(null=True, blank=True) # Best reps at that weight
+    max_weight_date = models.DateField(null=True, blank=True)
+
+    best_reps = models.PositiveIntegerField(null=True, blank=True) # Most reps at any weight
+    best_reps_date = models.DateField(null=True, blank=True)
+
+    estimated_1rm = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True) # Epley estimate
+    estimated_1rm_date = models.DateField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['exercise_key']
+
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'exercise_key'], name='unique_personal_record_per_exercise')
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}'s records for {self.exercise_name}"
+
+class MediaBlob(models.Model):
+    """
+    A content-addressed upload, counted by the image fields referencing it.
+    """
+    name = models.CharField(max_length=255, unique=True) # Storage name: <dir>/<aa>/<sha256>.<ext>
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
@@ -0,0 +1,194 @@
+# workouts/pagination.py
+
+from base64 import b64decode, b64encode
+from datetime import date
+from urllib import parse
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from django.core.paginator import InvalidPage
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# Workout keyset ordering and its reverse, with id as a unique tiebreaker
+WORKOUT_KEYSET_ORDERING = ('-date', 'exercise_name', 'id')
+WORKOUT_KEYSET_REVERSE_ORDERING = ('date', '-exercise_name', '-id')
+
+
+def workouts_after(position):
+    """
+    Workouts that sort after `position` (date, exercise_name, id) in keyset order.
+    """
+    day, name, pk = position
+    return (
+        Q(date__lt=day)
+        | Q(date=day, exercise_name__gt=name)
+        | Q(date=day, exercise_name=name, id__gt=pk)
+    )
+
+
+def workouts_before(position):
+    """
+    Workouts that sort before `position` (date, exercise_name, id) in keyset order.
+    """
+    day, name, pk = position
+    return (
+        Q(date__gt=day)
+        | Q(date=day, exercise_name__lt=name)
+        | Q(date=day, exercise_name=name, id__lt=pk)
+    )
+
+
+class WorkoutCursorPagination(BasePagination):
+    """
+    Keyset pagination over (date, exercise_name, id), matching Workout's ordering.
+
+    Each page seeks directly past the previous page's last row, so deep pages
+    cost the same as the first one and no COUNT query is issued.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    ordering = WORKOUT_KEYSET_ORDERING
+    reverse_ordering = WORKOUT_KEYSET_REVERSE_ORDERING
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, cursor = self.seek(queryset, request)
+        # Fetch one extra row to learn whether another page exists
+        return self.set_page(list(queryset[:self.page_size + 1]), cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async counterpart of paginate_queryset, for async views.
+        """
+        queryset, cursor = self.seek(queryset, request)
+        return self.set_page([item async for item in queryset[:self.page_size + 1]], cursor)
+
+    def seek(self, queryset, request):
+        """
+        Order the queryset and position it at the requested cursor; returns (queryset, cursor).
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+
+        if cursor is None:
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            reverse, position = cursor
+            if reverse:
+                queryset = queryset.filter(workouts_before(position)).order_by(*self.reverse_ordering)
+            else:
+                queryset = queryset.filter(workouts_after(position)).order_by(*self.ordering)
+        return queryset, cursor
+
+    def set_page(self, results, cursor):
+        """
+        Keep the page from up to page_size + 1 fetched rows and work out its links.
+        """
+        reverse = cursor is not None and cursor[0]
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def get_position(self, item):
+        if isinstance(item, dict): # Rows read with values()
+            return (item['date'], item['exercise_name'], item['id'])
+        return (item.date, item.exercise_name, item.pk)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.get_position(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.get_position(self.page[0]))
+
+    def decode_cursor(self, request):
+        """
+        Parse the cursor query parameter into (reverse, position), or None for the first page.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('utf-8')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = tokens.get('r', ['0'])[0] == '1'
+            position = (
+                date.fromisoformat(tokens['d'][0]),
+                tokens['n'][0],
+                int(tokens['i'][0]),
+            )
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return reverse, position
+
+    def encode_cursor(self, reverse, position):
+        day, name, pk = position
+        tokens = {'d': day.isoformat(), 'n': name, 'i': pk}
+        if reverse:
+            tokens['r'] = '1'
+        encoded = b64encode(parse.urlencode(tokens, doseq=True).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination with an async counterpart of paginate_queryset, for async views.
+    """
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount() # Seed the cached count so page() runs no query
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        self.page.object_list = [item async for item in self.page.object_list]
+        self.request = request
+        return list(self.page)
@@ -0,0 +1,190 @@
+# workouts/records.py
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import NamedTuple
+from django.db import transaction
+from .exercises import exercise_key
+from .models import PersonalRecord, Workout
+
+# Fields of PersonalRecord computed from workouts
+RECORD_FIELDS = (
+    'exercise_name', 'max_weight', 'max_weight_reps', 'max_weight_date',
+    'best_reps', 'best_reps_date', 'estimated_1rm', 'estimated_1rm_date',
+)
+
+
+# Reps beyond this count as endurance, not strength; capping them also keeps any estimate
+# (at most twice the heaviest storable weight) within PersonalRecord.estimated_1rm
+EPLEY_MAX_REPS = 30
+
+
+def estimated_one_rep_max(weight, reps):
+    """
+    Epley one-rep-max estimate, or None without both weight and reps.
+    """
+    if weight is None or not reps:
+        return None
+    if reps == 1:
+        return Decimal(weight)
+    reps = min(reps, EPLEY_MAX_REPS)
+    return (Decimal(weight) * (1 + Decimal(reps) / 30)).quantize(Decimal('0.01'))
+
+
+class RecordEntry(NamedTuple):
+    """
+    What a single workout can contribute to its exercise's personal records.
+    """
+    key: str
+    exercise_name: str
+    weight_used: object
+    reps: object
+    date: object
+
+    @classmethod
+    def from_workout(cls, workout):
+        return cls(
+            key=exercise_key(workout.exercise_name),
+            exercise_name=workout.exercise_name,
+            weight_used=workout.weight_used,
+            reps=workout.reps,
+            date=workout.date,
+        )
+
+    @property
+    def estimated_1rm(self):
+        return estimated_one_rep_max(self.weight_used, self.reps)
+
+
+def improve_record(record, entry):
+    """
+    Fold one entry into a record; returns whether any personal best changed.
+
+    Ties keep the existing record, so folding in date order credits the first time a best was set.
+    """
+    improved = False
+    record_dates = [day for day in (record.max_weight_date, record.best_reps_date, record.estimated_1rm_date) if day]
+
+    if entry.weight_used is not None:
+        if record.max_weight is None or entry.weight_used > record.max_weight or (
+            entry.weight_used == record.max_weight and (entry.reps or 0) > (record.max_weight_reps or 0)
+        ):
+            record.max_weight = entry.weight_used
+            record.max_weight_reps = entry.reps
+            record.max_weight_date = entry.date
+            improved = True
+
+    if entry.reps is not None and (record.best_reps is None or entry.reps > record.best_reps):
+        record.best_reps = entry.reps
+        record.best_reps_date = entry.date
+        improved = True
+
+    one_rep_max = entry.estimated_1rm
+    if one_rep_max is not None and (record.estimated_1rm is None or one_rep_max > record.estimated_1rm):
+        record.estimated_1rm = one_rep_max
+        record.estimated_1rm_date = entry.date
+        improved = True
+
+    # Keep the name from the most recent record-setting workout, even when older history is added later
+    if improved and (not record_dates or entry.date >= max(record_dates)):
+        record.exercise_name = entry.exercise_name
+    return improved
+
+
+def holds_record(record, entry):
+    """
+    Whether removing `entry` could lower one of the record's bests.
+    """
+    return (
+        (entry.weight_used is not None and entry.weight_used == record.max_weight)
+        or (entry.reps is not None and entry.reps == record.best_reps)
+        or (entry.estimated_1rm is not None and entry.estimated_1rm == record.estimated_1rm)
+    )
+
+
+def exercise_workouts(user_id, key):
+    """
+    The user's workouts whose exercise name normalizes to `key`, joined through the exercise catalog.
+    """
+    return Workout.objects.filter(user_id=user_id, exercise__normalized_name=key)
+
+
+def build_records(entries, user_id):
+    """
+    Unsaved PersonalRecords, one per exercise key, from entries in date order.
+    """
+    records = {}
+    for entry in entries:
+        record = records.get(entry.key)
+        if record is None:
+            record = records[entry.key] = PersonalRecord(user_id=user_id, exercise_key=entry.key)
+        improve_record(record, entry)
+    return records
+
+
+def recompute_record(user_id, key):
+    """
+    Rebuild one exercise's PersonalRecord from the user's workouts; deletes it when none remain.
+    """
+    rows = exercise_workouts(user_id, key).order_by('date', 'id').values_list(
+        'exercise_name', 'weight_used', 'reps', 'date'
+    )
+    built = build_records((RecordEntry(key, *row) for row in rows), user_id).get(key)
+
+    if built is None:
+        PersonalRecord.objects.filter(user_id=user_id, exercise_key=key).delete()
+        return None
+
+    record, _ = PersonalRecord.objects.update_or_create(
+        user_id=user_id,
+        exercise_key=key,
+        defaults={field: getattr(built, field) for field in RECORD_FIELDS},
+    )
+    return record
+
+
+@transaction.atomic
+def apply_personal_records(user_id, removed=(), added=()):
+    """
+    Update the user's PersonalRecords for removed and added workout entries.
+
+    Must be called after the workout write itself. Additions only ever
+    improve a record; a removal rebuilds the exercise's record only when
+    the removed workout held one of its bests.
+    """
+    keys = {entry.key for entry in removed} | {entry.key for entry in added}
+    if not keys:
+        return
+
+    records = {
+        record.exercise_key: record
+        for record in PersonalRecord.objects.select_for_update().filter(user_id=user_id, exercise_key__in=keys)
+    }
+
+    rebuild = set()
+    for entry in removed:
+        record = records.get(entry.key)
+        if record is None or holds_record(record, entry):
+            rebuild.add(entry.key)
+
+    grouped = defaultdict(list)
+    for entry in added:
+        grouped[entry.key].append(entry)
+
+    for key, entries in grouped.items():
+        record = records.get(key)
+        if record is None:
+            # First workout of this exercise (or a row we never built): build it from scratch
+            rebuild.add(key)
+            continue
+        if key in rebuild:
+            continue
+
+        improved = False
+        for entry in sorted(entries, key=lambda entry: entry.date):
+            improved = improve_record(record, entry) or improved
+        if improved:
+            record.save(update_fields=[*RECORD_FIELDS, 'updated_at'])
+
+    for key in rebuild:
+        recompute_record(user_id, key)
@@ -1,5 +1,10 @@
+from decimal import Decimal
+from django.db import connections, router
 from rest_framework import serializers
-from .models import Workout, Category, Analytics
+from .models import Workout, Category, Analytics, PersonalRecord, Exercise
+from .cache import category_cache
+from .exercises import exercise_id_for, exercise_ids_for, exercise_key
+from .images import rendition_urls, schedule_renditions
 
 # Serializer for Category model
 class CategorySerializer(serializers.ModelSerializer):
@@ -10,21 +15,110 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name'] # Minimal fields for listing and creation
 
+# Category reference validated against the category cache
+class CachedCategoryField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field for Category that validates ids against the category
+    cache instead of issuing a query per value.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        name = category_cache.name_for(pk)
+        if name is None:
+            self.fail('does_not_exist', pk_value=data)
+        return Category(pk=pk, name=name)
+
+# Bulk creation for many=True workout serializers
+class WorkoutListSerializer(serializers.ListSerializer):
+    """
+    Creates all validated workouts with a single bulk INSERT, resolving their exercises in one batch.
+
+    Backends that cannot return rows from a bulk INSERT (MySQL) would leave
+    the primary keys unset, and the response needs them, so there each
+    workout gets its own INSERT (inside the caller's transaction).
+    """
+    def create(self, validated_data):
+        exercise_ids = exercise_ids_for(attrs['exercise_name'] for attrs in validated_data)
+        workouts = [
+            Workout(exercise_id=exercise_ids[exercise_key(attrs['exercise_name'])], **attrs)
+            for attrs in validated_data
+        ]
+        if not connections[router.db_for_write(Workout)].features.can_return_rows_from_bulk_insert:
+            for workout in workouts:
+                workout.save(force_insert=True)
+            return workouts
+        return Workout.objects.bulk_create(workouts)
+
 # Serializer for Workout model
 class WorkoutSerializer(serializers.ModelSerializer):
     """
     Serializer for the Workout model.
     """
-    category_name = serializers.CharField(source='category.name', read_only=True) # Exposes category name
+    category = CachedCategoryField(queryset=Category.objects.all(), required=False, allow_null=True)
+    category_name = serializers.SerializerMethodField() # Exposes category name, resolved from the category cache
+    image_renditions = serializers.SerializerMethodField() # Resized WebP/JPEG versions of the image
 
     class Meta:
         model = Workout
         fields = [
-            'id', 'user', 'exercise_name', 'weight_used', 'reps', 'sets', 
-            'date', 'notes', 'image', 'category', 'category_name',
+            'id', 'user', 'exercise_name', 'exercise', 'weight_used', 'reps', 'sets', 
+            'date', 'notes', 'image', 'image_renditions', 'category', 'category_name',
             'workout_duration_minutes'
         ]
-        read_only_fields = ['user', 'category_name']  # User is set from request context; category_name is derived
+        # User is set from request context; exercise and category_name are derived
+        read_only_fields = ['user', 'exercise', 'category_name']
+        list_serializer_class = WorkoutListSerializer
+
+    def get_category_name(self, obj):
+        return category_cache.name_for(obj.category_id)
+
+    def get_image_renditions(self, obj):
+        return rendition_urls(obj.image, self.context.get('request'))
+
+    def create(self, validated_data):
+        validated_data['exercise_id'] = exercise_id_for(validated_data['exercise_name'])
+        workout = super().create(validated_data)
+        schedule_renditions(workout.image)
+        return workout
+
+    def update(self, instance, validated_data):
+        if 'exercise_name' in validated_data:
+            validated_data['exercise_id'] = exercise_id_for(validated_data['exercise_name'])
+        workout = super().update(instance, validated_data)
+        if validated_data.get('image'):
+            schedule_renditions(workout.image)
+        return workout
+
+# Serializer for one row of a CSV workout import
+class WorkoutImportSerializer(WorkoutSerializer):
+    """
+    Validates an imported workout row with the WorkoutSerializer rules.
+
+    Categories are given by name and resolved through the `category_ids`
+    mapping in the serializer context (loaded once per import batch).
+    """
+    category = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+
+    class Meta(WorkoutSerializer.Meta):
+        fields = [
+            'exercise_name', 'weight_used', 'reps', 'sets', 'date', 'notes',
+            'category', 'workout_duration_minutes'
+        ]
+        list_serializer_class = serializers.ListSerializer
+
+    def validate_category(self, value):
+        if not value:
+            return None
+        pk = self.context['category_ids'].get(value)
+        if pk is None:
+            raise serializers.ValidationError(f'Unknown category "{value}".')
+        return Category(pk=pk, name=value)
 
 # Serializer for Analytics model
 class AnalyticsSerializer(serializers.ModelSerializer):
@@ -39,4 +133,117 @@ class AnalyticsSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'user', 'total_volume', 'max_lift', 'average_intensity', 'strength_level',
             'total_calories_burned', 'weekly_workout_duration_minutes'
-        ] # All fields except user and week_start_date are computed
\ No newline at end of file
+        ] # All fields except user and week_start_date are computed
+
+# Serializer for Exercise model
+class ExerciseSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Exercise catalog.
+    """
+    class Meta:
+        model = Exercise
+        fields = ['id', 'name', 'normalized_name']
+        read_only_fields = fields
+
+# Serializer for PersonalRecord model
+class PersonalRecordSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the PersonalRecord model (read-only; records are maintained from workouts).
+    """
+    class Meta:
+        model = PersonalRecord
+        fields = [
+            'exercise_key', 'exercise_name', 'max_weight', 'max_weight_reps', 'max_weight_date',
+            'best_reps', 'best_reps_date', 'estimated_1rm', 'estimated_1rm_date', 'updated_at'
+        ]
+        read_only_fields = fields
+
+# Lean read-only serializers for high-volume list responses
+def decimal_string(value, places):
+    """
+    A decimal as DRF's DecimalField renders it (a string with `places` decimals), or None.
+    """
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return f'{value.quantize(Decimal(1).scaleb(-places)):f}'
+
+def date_string(value):
+    return value.isoformat() if value is not None else None
+
+class WorkoutRowSerializer:
+    """
+    Serializes workout rows read with `values(*WorkoutRowSerializer.fields)`
+    to the same output as WorkoutSerializer, without building a field tree
+    per request or a model instance per row.
+    """
+    fields = (
+        'id', 'user_id', 'exercise_name', 'exercise_id', 'weight_used', 'reps', 'sets',
+        'date', 'notes', 'image', 'category_id', 'workout_duration_minutes',
+    )
+
+    def __init__(self, rows, request=None):
+        self.rows = rows
+        self.request = request
+
+    @property
+    def data(self):
+        names_by_id = category_cache.snapshot().names_by_id
+        image_field = Workout._meta.get_field('image')
+        request = self.request
+
+        data = []
+        for row in self.rows:
+            image = image_field.attr_class(None, image_field, row['image']) if row['image'] else None
+            if image is None:
+                image_url = None
+            elif request is not None:
+                image_url = request.build_absolute_uri(image.url)
+            else:
+                image_url = image.url
+            data.append({
+                'id': row['id'],
+                'user': row['user_id'],
+                'exercise_name': row['exercise_name'],
+                'exercise': row['exercise_id'],
+                'weight_used': decimal_string(row['weight_used'], 2),
+                'reps': row['reps'],
+                'sets': row['sets'],
+                'date': date_string(row['date']),
+                'notes': row['notes'],
+                'image': image_url,
+                'image_renditions': rendition_urls(image, request),
+                'category': row['category_id'],
+                'category_name': names_by_id.get(row['category_id']),
+                'workout_duration_minutes': row['workout_duration_minutes'],
+            })
+        return data
+
+class AnalyticsRowSerializer:
+    """
+    Serializes Analytics instances to the same output as AnalyticsSerializer, without field introspection.
+    """
+    def __init__(self, records, many=False):
+        self.records = records
+        self.many = many
+
+    @staticmethod
+    def to_representation(record):
+        return {
+            'id': record.pk,
+            'user': record.user_id,
+            'week_start_date': date_string(record.week_start_date),
+            'total_volume': decimal_string(record.total_volume, 2),
+            'max_lift': decimal_string(record.max_lift, 2),
+            'average_intensity': decimal_string(record.average_intensity, 2),
+            'strength_level': record.strength_level,
+            'total_calories_burned': record.total_calories_burned,
+            'weekly_workout_duration_minutes': record.weekly_workout_duration_minutes,
+        }
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(record) for record in self.records]
+        return self.to_representation(self.records)
@@ -0,0 +1,103 @@
+# workouts/signals.py
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from .images import RENDITION_FORMATS, RENDITION_SIZES, rendition_name
+from .models import MediaBlob
+from .storage import is_content_addressed
+
+
+def retain_blob(name):
+    """
+    Count one more reference to a content-addressed file.
+    """
+    if not is_content_addressed(name):
+        return
+
+    blob, created = MediaBlob.objects.get_or_create(name=name, defaults={'refcount': 1})
+    if not created:
+        MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+
+
+def release_blob(name, storage):
+    """
+    Drop one reference to a content-addressed file, deleting it (and its
+    renditions) once nothing references it and the transaction commits.
+    """
+    if not is_content_addressed(name):
+        return
+
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.refcount > 1:
+            MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+            return
+        blob.delete()
+
+    def delete_files():
+        # The same content may have been uploaded again since
+        if MediaBlob.objects.filter(name=name).exists():
+            return
+        storage.delete(name)
+        for size in RENDITION_SIZES:
+            for extension in RENDITION_FORMATS:
+                storage.delete(rendition_name(name, size, extension))
+
+    transaction.on_commit(delete_files)
+
+
+def track_media(model, field_name):
+    """
+    Keep MediaBlob reference counts in step with `model.<field_name>`.
+    """
+    field = model._meta.get_field(field_name)
+    attname = field.attname
+    uid = f'track_media:{model._meta.label}.{field_name}'
+
+    def stored_name(value):
+        return getattr(value, 'name', value) or None
+
+    def remember_loaded(sender, instance, **kwargs):
+        # Read __dict__ directly so deferred fields are not fetched
+        if attname in instance.__dict__:
+            instance.__dict__.setdefault('_stored_media', {})[attname] = stored_name(instance.__dict__[attname])
+
+    def remember_previous(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields is not None and attname not in update_fields):
+            return
+
+        stored = instance.__dict__.setdefault('_stored_media', {})
+        if instance._state.adding:
+            stored[attname] = None
+        elif attname not in stored:
+            stored[attname] = (
+                model._base_manager.filter(pk=instance.pk).values_list(attname, flat=True).first() or None
+            )
+
+    def update_references(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields is not None and attname not in update_fields):
+            return
+
+        stored = instance._stored_media
+        previous, current = stored.get(attname), stored_name(getattr(instance, attname))
+        if previous == current:
+            return
+
+        if current:
+            retain_blob(current)
+        if previous:
+            release_blob(previous, field.storage)
+        stored[attname] = current
+
+    def release_deleted(sender, instance, **kwargs):
+        name = stored_name(instance.__dict__.get(attname)) or instance.__dict__.get('_stored_media', {}).get(attname)
+        if name:
+            release_blob(name, field.storage)
+
+    post_init.connect(remember_loaded, sender=model, weak=False, dispatch_uid=uid)
+    pre_save.connect(remember_previous, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(update_references, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(release_deleted, sender=model, weak=False, dispatch_uid=uid)
@@ -0,0 +1,67 @@
+# workouts/storage.py
+
+import hashlib
+import posixpath
+import re
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+# Upload directories whose files are stored under their content digest
+CONTENT_ADDRESSED_DIRS = ('workout_images', 'profile_pics')
+
+_DIGEST_NAME = re.compile(
+    r'^(?:%s)/[0-9a-f]{2}/[0-9a-f]{64}(?:\.\w+)?$' % '|'.join(CONTENT_ADDRESSED_DIRS)
+)
+
+
+def is_content_addressed(name):
+    """
+    Whether a storage name points at a content-addressed blob (and is therefore immutable).
+    """
+    return bool(name) and _DIGEST_NAME.match(name) is not None
+
+
+class BlobExists(Exception):
+    pass
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps each unique upload once.
+
+    Files saved under CONTENT_ADDRESSED_DIRS are renamed to
+    `<dir>/<aa>/<sha256>.<ext>`; saving content that is already stored
+    returns the existing name instead of writing a copy. Other names
+    (e.g. renditions) are stored as usual.
+    """
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        directory = posixpath.normpath(name).split('/', 1)[0]
+        if directory not in CONTENT_ADDRESSED_DIRS:
+            return super().save(name, content, max_length)
+
+        name = self.digest_name(directory, name, content)
+        try:
+            return super().save(name, content, max_length)
+        except BlobExists:
+            return name
+
+    def digest_name(self, directory, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        hexdigest = digest.hexdigest()
+        extension = posixpath.splitext(name)[1].lower()
+        return f"{directory}/{hexdigest[:2]}/{hexdigest}{extension}"
+
+    def get_available_name(self, name, max_length=None):
+        # Never suffix a blob name: if it exists, identical content is already stored
+        if is_content_addressed(name) and self.exists(name):
+            raise BlobExists(name)
+        return super().get_available_name(name, max_length)
@@ -1,3 +1,1092 @@
-from django.test import TestCase
+from datetime import date, timedelta
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.test import APIClient, APIRequestFactory
+from GymLog.db_routers import pin_cache
+from GymLog.metrics import registry
+from users.models import UserProfile
+from users.serializers import ProfileTokenObtainPairSerializer
+from .analytics import CARDIO_TRAINING, STRENGTH_TRAINING, recompute_weeks, week_start
+from .cache import category_cache
+from .exercises import exercise_id_for
+from .images import RENDITION_FORMATS, RENDITION_SIZES, rendition_name
+from .importer import import_workouts_csv
+from .models import Analytics, Category, Exercise, MediaBlob, PersonalRecord, Workout
+from .records import RECORD_FIELDS
+from .serializers import AnalyticsRowSerializer, AnalyticsSerializer, WorkoutRowSerializer, WorkoutSerializer
+from .uploads import ImageUploadHandler
 
-# Create your tests here.
+
+class WorkoutAPITestMixin:
+    """
+    Base for API tests: the analytics categories, and a client authenticated
+    with a real access token (as the stateless token authentication sees it).
+    """
+    def setUp(self):
+        caches['default'].clear()
+        self.strength = Category.objects.create(name=STRENGTH_TRAINING)
+        self.cardio = Category.objects.create(name=CARDIO_TRAINING)
+        category_cache.invalidate() # Snapshots from other tests name rolled-back rows
+
+        self.user = self.create_user('lifter')
+        self.client = APIClient()
+        self.authenticate(self.user)
+
+    def create_user(self, username, weight=Decimal('80')):
+        return UserProfile.objects.create_user(
+            username=username, email=f'{username}@example.com', password='test-pass-123', weight=weight
+        )
+
+    def authenticate(self, user):
+        token = ProfileTokenObtainPairSerializer.get_token(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def add_workouts(self, count, user=None, day=None, exercise_name='Bench Press', **fields):
+        """
+        Insert workouts directly, bypassing the analytics and records maintained by the API.
+        """
+        fields.setdefault('category', self.strength)
+        exercise_id = exercise_id_for(exercise_name)
+        return Workout.objects.bulk_create([
+            Workout(
+                user=user or self.user, exercise_name=exercise_name, exercise_id=exercise_id,
+                date=day or date.today(), weight_used=Decimal('60') + n, reps=5, sets=3,
+                workout_duration_minutes=10, **fields,
+            )
+            for n in range(count)
+        ])
+
+
+class WorkoutAPITestCase(WorkoutAPITestMixin, TestCase):
+    pass
+
+
+class ExerciseSearchTests(WorkoutAPITestCase):
+    def test_lists_only_own_exercises(self):
+        self.add_workouts(1, exercise_name='Squat')
+        self.add_workouts(1, exercise_name='Split Squat')
+        self.add_workouts(1, user=self.create_user('other'), exercise_name='Sumo Deadlift')
+
+        response = self.client.get(reverse('exercise-search'), {'search': 's'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([exercise['name'] for exercise in response.data], ['Split Squat', 'Squat'])
+
+        response = self.client.get(reverse('exercise-search'), {'search': 'deadlift'})
+        self.assertEqual(response.data, [])
+
+    def test_catalog_matched_by_prefix(self):
+        self.add_workouts(1, exercise_name='Bench Press')
+        self.add_workouts(1, exercise_name='Incline Bench Press')
+
+        with CaptureQueriesContext(connection) as queries:
+            searched = self.client.get(reverse('exercise-search'), {'search': 'Bench'}).data
+            filtered = self.client.get(reverse('workout-list-create'), {'exercise_name': 'bench'}).data['results']
+        self.assertEqual([exercise['name'] for exercise in searched], ['Bench Press'])
+        self.assertEqual([workout['exercise_name'] for workout in filtered], ['Bench Press'])
+
+        # Prefix patterns only: a leading wildcard would scan the whole shared catalog
+        catalog_queries = [query['sql'] for query in queries if '"normalized_name" LIKE' in query['sql']]
+        self.assertEqual(len(catalog_queries), 3) # Search, then the list's count and page
+        for sql in catalog_queries:
+            self.assertIn("LIKE 'bench%'", sql)
+
+
+class ConditionalGetTests(WorkoutAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.workouts = self.add_workouts(12)
+        category_cache.snapshot() # Warm, as in a running process
+
+    def revalidate(self, url, etag, queries):
+        with self.assertNumQueries(queries):
+            return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_list_validators_cost_no_extra_query(self):
+        url = reverse('workout-list-create')
+        with self.assertNumQueries(2): # Count and page
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+
+        self.assertEqual(self.revalidate(url, response['ETag'], 2).status_code, 304)
+
+    def test_list_etag_follows_page_changes(self):
+        url = reverse('workout-list-create')
+        response = self.client.get(url)
+        shown = [workout['id'] for workout in response.data['results']]
+
+        Workout.objects.get(pk=shown[0]).save() # Bumps updated_at
+        changed = self.revalidate(url, response['ETag'], 2)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+        # A deletion outside the page still changes the count
+        Workout.objects.exclude(pk__in=shown).first().delete()
+        self.assertEqual(self.revalidate(url, changed['ETag'], 2).status_code, 200)
+
+    def test_cursor_list_revalidation(self):
+        url = reverse('workout-list-create') + '?pagination=cursor'
+        with self.assertNumQueries(1): # Page only, no count
+            response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response['ETag'], 1).status_code, 304)
+
+    def test_detail_validators_cost_no_extra_query(self):
+        url = reverse('workout-detail', kwargs={'pk': self.workouts[0].pk})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+
+        self.assertEqual(self.revalidate(url, response['ETag'], 1).status_code, 304)
+        self.workouts[0].save()
+        self.assertEqual(self.revalidate(url, response['ETag'], 1).status_code, 200)
+
+    def test_detail_follows_category_rename(self):
+        url = reverse('workout-detail', kwargs={'pk': self.workouts[0].pk})
+        response = self.client.get(url)
+        # A date alone would vouch for the old category name, so none is sent
+        self.assertNotIn('Last-Modified', response)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('category-detail', kwargs={'pk': self.strength.pk}), {'name': 'Lifting'})
+        for headers in ({'HTTP_IF_NONE_MATCH': response['ETag']}, {'HTTP_IF_MODIFIED_SINCE': http_date()}):
+            with self.subTest(headers=list(headers)):
+                changed = self.client.get(url, **headers)
+                self.assertEqual(changed.status_code, 200)
+                self.assertEqual(changed.data['category_name'], 'Lifting')
+
+    def test_detail_of_other_user_is_not_found(self):
+        other = self.add_workouts(1, user=self.create_user('other'))[0]
+        response = self.client.get(reverse('workout-detail', kwargs={'pk': other.pk}))
+        self.assertEqual(response.status_code, 404)
+
+
+class CursorPaginationTests(WorkoutAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # Many ties in date and in (date, exercise_name), so only the id tiebreaker orders them
+        for day in (date(2024, 3, 4), date(2024, 3, 5), date(2024, 3, 6)):
+            for name in ('Bench Press', 'Squat'):
+                self.add_workouts(4, day=day, exercise_name=name)
+        self.expected = list(
+            Workout.objects.filter(user=self.user).order_by('-date', 'exercise_name', 'id').values_list('pk', flat=True)
+        )
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [workout['id'] for workout in response.data['results']], response.data
+
+    def test_pages_cover_every_row_once_in_order(self):
+        seen, last_url = [], reverse('workout-list-create') + '?pagination=cursor'
+        url = last_url
+        while url:
+            ids, data = self.page(url)
+            seen.extend(ids)
+            last_url, url = url, data['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(seen), 24)
+
+        # Back from the last page through the previous links
+        pages = []
+        ids, data = self.page(last_url)
+        url = data['previous']
+        while url:
+            ids, data = self.page(url)
+            pages.insert(0, ids)
+            url = data['previous']
+        self.assertEqual([pk for page in pages for pk in page], self.expected[:20])
+        self.assertEqual([len(page) for page in pages], [10, 10])
+
+    def test_tampered_cursor_not_found(self):
+        # Not base64, then encodings of: no id, a bad date, a non-numeric id
+        for cursor in ('not base64!', 'ZD0yMDI0LTAzLTA0Jm49eA==', 'ZD1ub3QtYS1kYXRlJm49eCZpPTE=', 'ZD0yMDI0LTAzLTA0Jm49eCZpPWFiYw=='):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('workout-list-create'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.data['detail'], 'Invalid cursor')
+
+
+class CategoryCacheTests(WorkoutAPITestCase):
+    def list_categories(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(reverse('category-list-create'), **headers)
+
+    def write(self, method, url, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 300)
+        return response
+
+    def test_matching_etag_not_modified(self):
+        etag = self.list_categories()['ETag']
+        with self.assertNumQueries(0): # Snapshot already cached
+            response = self.list_categories(etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_etag_and_snapshot(self):
+        etag = self.list_categories()['ETag']
+        created = self.write('post', reverse('category-list-create'), {'name': 'Mobility'}).data['id']
+        detail = reverse('category-detail', kwargs={'pk': created})
+
+        for change, expected in (
+            (lambda: None, 'Mobility'),
+            (lambda: self.write('patch', detail, {'name': 'Stretching'}), 'Stretching'),
+            (lambda: self.write('delete', detail), None),
+        ):
+            change()
+            with self.subTest(expected=expected):
+                response = self.list_categories(etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+                names = [category['name'] for category in response.data['results']]
+                self.assertEqual(expected in names, expected is not None)
+                self.assertEqual(len(names), 2 if expected is None else 3)
+                self.assertEqual(category_cache.snapshot().names_by_id.get(created), expected)
+                etag = response['ETag']
+
+
+class StaleCategoryTests(WorkoutAPITestCase):
+    def test_stored_analytics_ignore_local_category_snapshot(self):
+        category_cache.snapshot() # Warm, as in a running process
+        # Another worker swaps the categories; without a shared cache this process is not told
+        Category.objects.filter(pk=self.strength.pk).update(name='Old Strength')
+        Category.objects.filter(pk=self.cardio.pk).update(name=STRENGTH_TRAINING)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('workout-list-create'), {
+                'exercise_name': 'Bench Press', 'weight_used': '100', 'reps': 5, 'sets': 3,
+                'date': str(date.today()), 'category': self.cardio.pk, 'workout_duration_minutes': 30,
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Analytics.objects.get(user=self.user).total_volume, Decimal('1500'))
+
+
+class BulkCreateTests(WorkoutAPITestCase):
+    def post_batch(self, count):
+        batch = [
+            {'exercise_name': 'Squat', 'weight_used': str(100 + n), 'reps': 5, 'sets': 3, 'date': str(date.today())}
+            for n in range(count)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('workout-bulk-create'), batch, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def assert_ids_returned(self, response):
+        ids = [workout['id'] for workout in response.data]
+        self.assertNotIn(None, ids)
+        self.assertEqual(
+            list(Workout.objects.filter(pk__in=ids).order_by('pk').values_list('weight_used', flat=True)),
+            [Decimal(workout['weight_used']) for workout in sorted(response.data, key=lambda item: item['id'])],
+        )
+
+    def test_ids_returned(self):
+        self.assert_ids_returned(self.post_batch(3))
+
+    def test_ids_returned_without_bulk_returning(self):
+        # As on MySQL, where bulk_create cannot set primary keys
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            self.assert_ids_returned(self.post_batch(3))
+
+
+class BenchmarkCleanupTests(WorkoutAPITestCase):
+    def test_bulk_create_leaves_no_analytics_behind(self):
+        user = self.create_user('bench0')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                'benchmark_api', scenarios='bulk_create', requests=2, warmup=0, users=1,
+                password='test-pass-123', stdout=io.StringIO(),
+            )
+
+        self.assertFalse(Workout.objects.filter(user=user).exists())
+        self.assertFalse(Analytics.objects.filter(user=user).exists())
+        self.assertFalse(PersonalRecord.objects.filter(user=user).exists())
+
+
+class QueryCountTests(WorkoutAPITestCase):
+    """
+    Each endpoint runs a fixed number of queries, however much data the user has.
+    """
+    sizes = (1, 30)
+
+    def assert_queries(self, queries, seed, send, status_code=200, check=None):
+        for size in self.sizes:
+            user = self.create_user(f'user{size}')
+            seed(user, size)
+            self.authenticate(user)
+            category_cache.snapshot() # Warm, as in a running process
+
+            with self.subTest(size=size), self.assertNumQueries(queries):
+                response = send(user)
+            self.assertEqual(response.status_code, status_code)
+            if check is not None:
+                check(user)
+
+    def seed_week(self, user, size):
+        self.add_workouts(size, user=user)
+        self.add_workouts(size, user=user, exercise_name='Rowing', category=self.cardio)
+
+    def seed_weeks(self, user, size):
+        for weeks_ago in range(size):
+            self.add_workouts(2, user=user, day=date.today() - timedelta(weeks=weeks_ago))
+
+    def test_list(self):
+        # Count and page; validators come from the page rows
+        self.assert_queries(2, self.seed_week, lambda user: self.client.get(reverse('workout-list-create')))
+
+    def test_detail(self):
+        def seed(user, size):
+            self.seed_week(user, size)
+            self.workout_pk = Workout.objects.filter(user=user).latest('pk').pk
+
+        # The workout itself; validators come from its updated_at
+        self.assert_queries(1, seed, lambda user: self.client.get(
+            reverse('workout-detail', kwargs={'pk': self.workout_pk})
+        ))
+
+    def test_create(self):
+        # Exercise lookup and insert; profile weight and strength category; the week's row (absent,
+        # so built with one aggregate and upserted); the record (rebuilt with one query, then
+        # inserted); TestCase savepoints around each atomic block
+        self.assert_queries(26, self.seed_week, lambda user: self.client.post(reverse('workout-list-create'), {
+            'exercise_name': 'Bench Press', 'weight_used': '120', 'reps': 5, 'sets': 3,
+            'date': str(date.today()), 'category': self.strength.pk, 'workout_duration_minutes': 30,
+        }), status_code=201)
+
+    def test_analytics(self):
+        def seed(user, size):
+            self.seed_week(user, size)
+            self.authenticate(user)
+            self.client.get(reverse('analytics-generate')) # Builds the stored row, as workout writes do
+
+        # ETag aggregate, profile weight, stored row lookup
+        self.assert_queries(3, seed, lambda user: self.client.get(reverse('analytics-generate')))
+
+    def check_week_built(self, user):
+        self.assertEqual(Analytics.objects.get(user=user).workout_count, Workout.objects.filter(user=user).count())
+
+    def test_analytics_built_from_workouts(self):
+        # ETag aggregate, profile weight, stored row lookup (absent), one aggregate over the week's
+        # workouts, then the row saved (a locked lookup and insert, in savepoints)
+        self.assert_queries(
+            10, self.seed_week, lambda user: self.client.get(reverse('analytics-generate')),
+            check=self.check_week_built,
+        )
+
+    def test_analytics_built_from_workouts_async(self):
+        # User lookup, stored row lookup (absent), one aggregate over the week's workouts, then the
+        # row saved (a locked lookup and insert, in savepoints)
+        self.assert_queries(
+            9, self.seed_week, lambda user: self.client.get(reverse('async-analytics')),
+            check=self.check_week_built,
+        )
+
+    def test_history(self):
+        # ETag aggregate, profile weight, stored rows, whether any week is missing, one aggregate
+        # over every missing week (on the primary), the bulk upsert and the rows read back
+        self.assert_queries(7, self.seed_weeks, lambda user: self.client.get(reverse('analytics-history')))
+
+    def test_history_stored(self):
+        def seed(user, size):
+            self.seed_weeks(user, size)
+            self.authenticate(user)
+            self.client.get(reverse('analytics-history')) # Builds the stored rows
+
+        # ETag aggregate, profile weight, stored rows, and whether any week is missing
+        self.assert_queries(4, seed, lambda user: self.client.get(reverse('analytics-history')))
+
+
+class ExportMemoryTests(WorkoutAPITestCase):
+    def seed(self, count, user):
+        Workout.objects.bulk_create(
+            (
+                Workout(
+                    user=user, exercise_name='Bench Press', date=date.today() - timedelta(days=n % 3650),
+                    weight_used=Decimal('60'), reps=5, sets=3, notes='x' * 40, category=self.strength,
+                )
+                for n in range(count)
+            ),
+            batch_size=5000,
+        )
+
+    def export_peak(self, user):
+        """
+        Peak memory (bytes) allocated while streaming the user's export, and the rows it held.
+        """
+        self.authenticate(user)
+        response = self.client.get(reverse('workout-export'), {'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+
+        lines = 0
+        tracemalloc.start()
+        try:
+            for chunk in response.streaming_content:
+                lines += chunk.count(b'\n')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak, lines - 1 # Header
+
+    def test_memory_independent_of_history_size(self):
+        small, large = self.create_user('small'), self.create_user('large')
+        self.seed(4000, small)
+        self.seed(60000, large)
+
+        small_peak, small_rows = self.export_peak(small)
+        large_peak, large_rows = self.export_peak(large)
+
+        self.assertEqual((small_rows, large_rows), (4000, 60000))
+        # Both peak at one chunk of rows; fifteen times the history must not cost more memory
+        self.assertLess(large_peak, small_peak * 1.5)
+
+
+class RowSerializerEquivalenceTests(WorkoutAPITestCase):
+    """
+    The lean row serializers produce exactly what the model serializers do.
+    """
+    def test_workout_rows(self):
+        exercise_id = exercise_id_for('Bench Press')
+        Workout.objects.bulk_create([
+            Workout(
+                user=self.user, exercise_name='Bench Press', exercise_id=exercise_id, date=date(2024, 2, 29),
+                weight_used=Decimal('102.5'), reps=5, sets=3, notes='Paused', image='workout_images/bench.jpg',
+                category=self.strength, workout_duration_minutes=45,
+            ),
+            Workout( # Nulls everywhere they are allowed
+                user=self.user, exercise_name='Walk', date=date(2024, 3, 1),
+                weight_used=None, reps=None, sets=None, notes=None, image=None, category=None,
+            ),
+            Workout(
+                user=self.user, exercise_name='Rowing', date=date(2024, 3, 2), weight_used=Decimal('0'),
+                reps=0, sets=1, notes='', image='', category=self.cardio, workout_duration_minutes=0,
+            ),
+        ])
+        workouts = Workout.objects.filter(user=self.user).order_by('pk')
+        request = APIRequestFactory().get('/api/workouts/')
+
+        for context_request in (request, None):
+            with self.subTest(request=context_request is not None):
+                self.assertEqual(
+                    WorkoutRowSerializer(list(workouts.values(*WorkoutRowSerializer.fields)), context_request).data,
+                    WorkoutSerializer(workouts, many=True, context={'request': context_request}).data,
+                )
+
+    def test_analytics_rows(self):
+        stored = Analytics.objects.create(
+            user=self.user, week_start_date=date(2024, 2, 26), total_volume=Decimal('12345.6'),
+            max_lift=Decimal('102.50'), average_intensity=Decimal('0'), strength_level='Intermediate',
+            total_calories_burned=850, weekly_workout_duration_minutes=95,
+        )
+        stored.refresh_from_db()
+        # Derived metrics are refreshed in memory as floats before serialization
+        refreshed = Analytics(
+            pk=stored.pk + 1, user=self.user, week_start_date=date(2024, 3, 4), total_volume=1500.0,
+            max_lift=Decimal('100'), average_intensity=2.005, total_calories_burned=0,
+        )
+
+        for records in ([stored, refreshed], [stored]):
+            with self.subTest(records=len(records)):
+                self.assertEqual(
+                    AnalyticsRowSerializer(records, many=True).data,
+                    AnalyticsSerializer(records, many=True).data,
+                )
+        self.assertEqual(AnalyticsRowSerializer(stored).data, AnalyticsSerializer(stored).data)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked on SQLite")
+class IndexUsageTests(WorkoutAPITestCase):
+    """
+    Every workouts query of the list and analytics endpoints is an index search, not a table scan.
+    """
+    index = 'workout_user_date_name_idx'
+
+    def setUp(self):
+        super().setUp()
+        for weeks_ago in range(3):
+            self.add_workouts(3, day=date.today() - timedelta(weeks=weeks_ago))
+        self.add_workouts(3, user=self.create_user('other'))
+
+    def workout_plans(self, url, params=None):
+        """
+        (SQL, SQLite's plan) for each query on the workouts table the endpoint runs.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if query['sql'].startswith('SELECT') and 'FROM "workouts_workout"' in query['sql']:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                    plans.append((query['sql'], ' | '.join(row[-1] for row in cursor.fetchall())))
+        self.assertTrue(plans)
+        return plans
+
+    def assert_index_searches(self, plans):
+        for sql, plan in plans:
+            # A bare count may use the smaller foreign key index instead
+            index = r'\w+' if sql.startswith('SELECT COUNT(*)') else self.index
+            with self.subTest(plan=plan):
+                self.assertRegex(plan, rf'SEARCH workouts_workout USING (COVERING )?INDEX {index} \(user_id=\?')
+                self.assertNotIn('SCAN workouts_workout', plan)
+
+    def test_list(self):
+        self.assert_index_searches(self.workout_plans(reverse('workout-list-create')))
+        self.assert_index_searches(self.workout_plans(reverse('workout-list-create'), {'pagination': 'cursor'}))
+        self.assert_index_searches(self.workout_plans(
+            reverse('workout-list-create'), {'date_after': str(date.today() - timedelta(weeks=1))}
+        ))
+
+    def test_analytics(self):
+        plans = self.workout_plans(reverse('analytics-generate')) # Builds the week from workouts
+        self.assertEqual(len(plans), 2) # ETag aggregate and the week's aggregate
+        self.assert_index_searches(plans)
+
+    def test_history(self):
+        plans = self.workout_plans(reverse('analytics-history')) # Builds every week from workouts
+        self.assertEqual(len(plans), 3) # ETag aggregate, missing weeks check and their aggregate
+        self.assert_index_searches(plans)
+
+
+class PersonalRecordTests(WorkoutAPITestCase):
+    def log(self, weight_used, reps):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('workout-list-create'), {
+                'exercise_name': 'Push Press', 'weight_used': weight_used, 'reps': reps, 'sets': 1,
+                'date': str(date.today()),
+            })
+        self.assertEqual(response.status_code, 201)
+
+    def test_estimate_counts_at_most_thirty_reps(self):
+        self.log('100', 30000) # Would overflow the estimate field uncapped
+        self.assertEqual(PersonalRecord.objects.get(user=self.user).estimated_1rm, Decimal('200.00'))
+
+        self.log('999.99', 1000000) # Heaviest storable weight
+        record = PersonalRecord.objects.get(user=self.user)
+        self.assertEqual(record.estimated_1rm, Decimal('1999.98'))
+        self.assertEqual(record.best_reps, 1000000)
+
+
+REPLICA = 'replica1'
+
+# A file-based cache is visible to every worker process, like Redis or Memcached
+PIN_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'gymlog-test-pins'),
+    },
+}
+
+
+@skipUnless(connection.vendor == 'sqlite', "The replica is a second SQLite database")
+@override_settings(CACHES=PIN_CACHES, REPLICA_PIN_CACHE_ALIAS='shared', DATABASE_REPLICAS=[REPLICA])
+class LaggingReplicaTests(WorkoutAPITestMixin, TransactionTestCase):
+    """
+    Analytics history reads from a real second database that has not caught up with the primary.
+
+    Not a TestCase: reads inside its wrapping transaction would all stay on the primary.
+    """
+    @classmethod
+    def setUpClass(cls):
+        # Added here rather than in settings (or as a class attribute the runner would check first)
+        cls.replica_dir = tempfile.mkdtemp()
+        name = os.path.join(cls.replica_dir, 'replica.sqlite3')
+        primary = connections.settings[DEFAULT_DB_ALIAS]
+        connections.settings[REPLICA] = {**primary, 'NAME': name, 'TEST': {**primary['TEST'], 'NAME': name}}
+        with override_settings(DATABASE_ROUTERS=[]): # The replica router only migrates the primary
+            call_command('migrate', database=REPLICA, verbosity=0)
+        cls.databases = {DEFAULT_DB_ALIAS, REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        shutil.rmtree(cls.replica_dir)
+
+    def setUp(self):
+        super().setUp()
+        caches['shared'].clear()
+        self.week = week_start(date.today())
+        self.workouts = self.add_workouts(3, day=self.week)
+
+    def tearDown(self):
+        # Flushing skips the replica, which the router keeps every table off
+        for model in (Analytics, Workout, Exercise, Category, UserProfile):
+            model.objects.using(REPLICA).all().delete()
+        super().tearDown()
+
+    def replicate(self, *querysets):
+        """
+        Copy rows to the replica, as replication eventually would.
+        """
+        for queryset in querysets:
+            queryset.model.objects.using(REPLICA).bulk_create(list(queryset.using(DEFAULT_DB_ALIAS)))
+
+    def replicate_all_but_last_workout(self):
+        self.replicate(
+            UserProfile.objects.all(), Category.objects.all(), Exercise.objects.all(),
+            Workout.objects.exclude(pk=self.workouts[-1].pk),
+        )
+
+    def get_history(self):
+        response = self.client.get(reverse('analytics-history'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_stored_week_not_overwritten_from_replica(self):
+        self.client.get(reverse('analytics-generate')) # Builds the week on the primary, from its three workouts
+        self.assertEqual(Analytics.objects.using(DEFAULT_DB_ALIAS).get(user=self.user).workout_count, 3)
+        self.replicate_all_but_last_workout() # The replica has neither the row nor the last workout
+
+        self.get_history()
+        self.assertEqual(Analytics.objects.using(DEFAULT_DB_ALIAS).get(user=self.user).workout_count, 3)
+
+    def test_missing_week_built_from_primary(self):
+        self.replicate_all_but_last_workout()
+
+        response = self.get_history()
+        self.assertEqual(Analytics.objects.using(DEFAULT_DB_ALIAS).get(user=self.user).workout_count, 3)
+        self.assertEqual([week['week_start_date'] for week in response.data], [str(self.week)])
+
+    @override_settings(CATEGORY_CACHE_ALIAS='shared')
+    def test_new_category_visible_to_other_users(self):
+        other = self.create_user('other')
+        self.replicate(UserProfile.objects.all(), Category.objects.all())
+        response = self.client.post(reverse('category-list-create'), {'name': 'Mobility'})
+        self.assertEqual(response.status_code, 201)
+        category_id = response.data['id'] # Not on the replica yet
+
+        # The other user is not pinned, so their reads go to the replica; the cached catalog must not
+        self.authenticate(other)
+        response = self.client.get(reverse('category-list-create'))
+        self.assertIn('Mobility', [category['name'] for category in response.data['results']])
+
+        response = self.client.post(reverse('workout-list-create'), {
+            'exercise_name': 'Hip Flow', 'date': str(self.week), 'category': category_id,
+        })
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(REPLICA_PIN_CACHE_ALIAS='default')
+    def test_pins_need_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            pin_cache()
+
+
+class PersonalRecordMigrationTests(TransactionTestCase):
+    """
+    Migrating to personal records fills them from existing workouts, as rebuild_personal_records does.
+    """
+    before = [('workouts', '0014_mediablob')]
+    after = [('workouts', '0015_personalrecord')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_records_filled_from_workouts(self):
+        apps = self.migrate(self.before)
+        user = apps.get_model('users', 'UserProfile').objects.create(username='lifter', email='lifter@example.com')
+        apps.get_model('workouts', 'Workout').objects.bulk_create([
+            apps.get_model('workouts', 'Workout')(
+                user_id=user.pk, exercise_name=name, weight_used=weight, reps=reps, sets=3, date=day
+            )
+            for name, weight, reps, day in (
+                ('Bench Press', Decimal('100'), 5, date(2024, 3, 1)),
+                ('bench  press', Decimal('100'), 8, date(2024, 3, 8)), # Same weight, more reps
+                ('Bench Press', Decimal('80'), 40, date(2024, 3, 15)), # Reps capped in the estimate
+                ('Walk', None, None, date(2024, 3, 2)),
+                ('Squat', Decimal('140'), 3, date(2024, 3, 3)),
+                ('Squat', Decimal('140'), 3, date(2024, 3, 10)), # A tie keeps the first date
+            )
+        ])
+
+        apps = self.migrate(self.after)
+        fields = ('exercise_key', *RECORD_FIELDS)
+        migrated = list(apps.get_model('workouts', 'PersonalRecord').objects.order_by('exercise_key').values_list(*fields))
+        self.assertEqual([record[:2] for record in migrated], [('bench press', 'Bench Press'), ('squat', 'Squat'), ('walk', '')])
+
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        call_command('rebuild_personal_records', stdout=io.StringIO())
+        self.assertEqual(migrated, list(PersonalRecord.objects.order_by('exercise_key').values_list(*fields)))
+
+
+class MetricsTests(WorkoutAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.workouts = self.add_workouts(5)
+        category_cache.snapshot() # Warm, as in a running process
+        registry.reset()
+
+    def metric(self, name, route):
+        for line in registry.render().splitlines():
+            if line.startswith(name + '{') and f'route="{route}"' in line:
+                return float(line.rsplit(' ', 1)[1])
+        return None
+
+    def test_serialization_timed_for_list_and_detail(self):
+        self.client.get(reverse('workout-list-create'))
+        self.client.get(reverse('workout-detail', kwargs={'pk': self.workouts[0].pk}))
+
+        for route in ('api/workouts/', 'api/workouts/<int:pk>/'):
+            with self.subTest(route=route):
+                self.assertGreater(self.metric('gymlog_serialize_seconds_total', route), 0)
+                self.assertEqual(self.metric('gymlog_db_queries_total', route), 2 if route == 'api/workouts/' else 1)
+
+
+class AnalyticsMaintenanceTests(WorkoutAPITestCase):
+    """
+    Workout and category writes keep the stored weekly rows equal to a rebuild from the workouts.
+    """
+    def setUp(self):
+        super().setUp()
+        self.this_week = week_start(date.today())
+        self.last_week = self.this_week - timedelta(weeks=1)
+
+    def send(self, method, url, data=None, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, **kwargs)
+        self.assertLess(response.status_code, 300, response.data)
+        return response
+
+    def log(self, weight_used, day=None, category=None):
+        response = self.send('post', reverse('workout-list-create'), {
+            'exercise_name': 'Bench Press', 'weight_used': weight_used, 'reps': 5, 'sets': 3,
+            'date': str(day or self.this_week), 'category': (category or self.strength).pk,
+            'workout_duration_minutes': 30,
+        })
+        return response.data['id']
+
+    def change(self, workout_id, **fields):
+        self.send('patch', reverse('workout-detail', kwargs={'pk': workout_id}), fields, format='multipart')
+
+    def week(self, week_start_date):
+        """
+        (workout count, volume, max lift, minutes, MET minutes) stored for a week, or None.
+        """
+        return Analytics.objects.filter(user=self.user, week_start_date=week_start_date).values_list(
+            'workout_count', 'total_volume', 'max_lift', 'weekly_workout_duration_minutes', 'met_minutes',
+        ).first()
+
+    def test_date_change_moves_workout_between_weeks(self):
+        heaviest = self.log('100')
+        self.log('80')
+
+        self.change(heaviest, date=str(self.last_week))
+        self.assertEqual(self.week(self.this_week), (1, 1200, 80, 30, 180)) # Max lift rescanned
+        self.assertEqual(self.week(self.last_week), (1, 1500, 100, 30, 180))
+
+        self.change(heaviest, date=str(self.this_week))
+        self.assertEqual(self.week(self.this_week), (2, 2700, 100, 60, 360))
+        self.assertIsNone(self.week(self.last_week))
+
+    def test_max_lift_rescanned_when_heaviest_deleted(self):
+        heaviest = self.log('100')
+        self.log('80')
+        self.log('100') # Ties stay
+
+        self.send('delete', reverse('workout-detail', kwargs={'pk': heaviest}))
+        self.assertEqual(self.week(self.this_week), (2, 2700, 100, 60, 360))
+
+        self.change(self.log('120'), weight_used='90')
+        self.assertEqual(self.week(self.this_week), (3, 4050, 100, 90, 540))
+
+    def test_category_change_into_and_out_of_strength(self):
+        workout = self.log('100', category=self.cardio)
+        self.assertEqual(self.week(self.this_week), (1, 0, 0, 30, 210))
+
+        self.change(workout, category=self.strength.pk)
+        self.assertEqual(self.week(self.this_week), (1, 1500, 100, 30, 180))
+
+        self.change(workout, category=self.cardio.pk)
+        self.assertEqual(self.week(self.this_week), (1, 0, 0, 30, 210))
+
+    def test_row_deleted_when_week_empties(self):
+        workout = self.log('100')
+        self.send('delete', reverse('workout-detail', kwargs={'pk': workout}))
+        self.assertFalse(Analytics.objects.filter(user=self.user).exists())
+
+    def test_category_rename_rebuilds_weeks(self):
+        self.log('100')
+        self.log('80', day=self.last_week, category=self.cardio)
+
+        self.send('patch', reverse('category-detail', kwargs={'pk': self.strength.pk}), {'name': 'Lifting'})
+        self.assertEqual(self.week(self.this_week), (1, 0, 0, 30, 210))
+
+        self.send('patch', reverse('category-detail', kwargs={'pk': self.cardio.pk}), {'name': STRENGTH_TRAINING})
+        self.assertEqual(self.week(self.last_week), (1, 1200, 80, 30, 180))
+        self.assertEqual(self.week(self.this_week), (1, 0, 0, 30, 210))
+
+    def test_category_delete_rebuilds_weeks(self):
+        self.log('100')
+        self.log('80', day=self.last_week)
+
+        self.send('delete', reverse('category-detail', kwargs={'pk': self.strength.pk}))
+        self.assertEqual(self.week(self.this_week), (1, 0, 0, 30, 210))
+        self.assertEqual(self.week(self.last_week), (1, 0, 0, 30, 210))
+
+
+class WorkoutImportTests(WorkoutAPITestCase):
+    header = 'date,exercise_name,category,weight_used,reps,sets,workout_duration_minutes,notes\n'
+
+    def setUp(self):
+        super().setUp()
+        self.this_week = week_start(date.today())
+        self.last_week = self.this_week - timedelta(weeks=1)
+
+    def upload(self, text):
+        upload = io.BytesIO(text.encode('utf-8'))
+        upload.name = 'workouts.csv'
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('workout-import'), {'file': upload}, format='multipart')
+
+    def test_import_rebuilds_analytics_and_records(self):
+        response = self.upload(self.header + (
+            f'{self.this_week},Bench Press,{STRENGTH_TRAINING},100,5,3,30,Heavy\n'
+            f'{self.this_week},bench  press,{STRENGTH_TRAINING},80,8,3,20,\n'
+            f'{self.last_week},Rowing,{CARDIO_TRAINING},,,,40,\n'
+        ))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'created': 3, 'skipped': 0, 'errors': []})
+
+        self.assertEqual(
+            list(Analytics.objects.filter(user=self.user).values_list('week_start_date', 'workout_count', 'total_volume')),
+            [(self.this_week, 2, 3420), (self.last_week, 1, 0)],
+        )
+        record = PersonalRecord.objects.get(user=self.user, exercise_key='bench press')
+        self.assertEqual((record.max_weight, record.best_reps), (100, 8))
+
+    def test_invalid_rows_reported_by_line(self):
+        response = self.upload(self.header + (
+            f'{self.this_week},Bench Press,{STRENGTH_TRAINING},100,5,3,30,\n'
+            f'{self.this_week},Bench Press,Yoga,100,5,3,30,\n'
+            f'{self.this_week},Bench Press,,100,lots,3,30,\n'
+            f',Bench Press,,100,5,3,30,\n'
+        ))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['skipped']), (1, 3))
+        self.assertEqual(
+            [(error['line'], sorted(error['errors'])) for error in response.data['errors']],
+            [(3, ['category']), (4, ['reps']), (5, ['date'])],
+        )
+        self.assertIn('Unknown category "Yoga".', response.data['errors'][0]['errors']['category'])
+        self.assertEqual(Workout.objects.filter(user=self.user).count(), 1)
+
+    def test_missing_columns_rejected(self):
+        response = self.upload('exercise_name,reps\nBench Press,5\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'file': ['Missing required column(s): date.']})
+        self.assertFalse(Workout.objects.exists())
+
+    def test_batches_share_lines_records_and_weeks(self):
+        rows = [
+            f'{self.last_week},Squat,,100,5,3,10,', # Batch 1
+            f'{self.this_week},Squat,{STRENGTH_TRAINING},120,3,3,10,',
+            f'{self.this_week},Squat,,not a weight,5,3,10,', # Batch 2
+            f'{self.this_week},Squat,{STRENGTH_TRAINING},110,3,3,10,',
+            f'{self.last_week},Squat,{CARDIO_TRAINING},90,12,1,10,', # Batch 3
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_workouts_csv(self.user, io.StringIO(self.header + '\n'.join(rows) + '\n'), batch_size=2)
+
+        self.assertEqual((result['created'], result['skipped']), (4, 1))
+        self.assertEqual([error['line'] for error in result['errors']], [4])
+        self.assertEqual(
+            list(Analytics.objects.filter(user=self.user).values_list('week_start_date', 'workout_count', 'max_lift')),
+            [(self.this_week, 2, 120), (self.last_week, 2, 0)],
+        )
+        record = PersonalRecord.objects.get(user=self.user, exercise_key='squat')
+        self.assertEqual((record.max_weight, record.best_reps), (120, 12))
+
+
+def image_bytes(size=(64, 48), format='PNG', color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format)
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_UPLOAD_MAX_BYTES=10 * 1024, IMAGE_UPLOAD_MAX_DIMENSION=50, IMAGE_UPLOAD_MAX_PIXELS=2000)
+class ImageUploadTests(WorkoutAPITestCase):
+    def post_image(self, content, name='lift.png'):
+        return self.client.post(reverse('workout-list-create'), {
+            'exercise_name': 'Bench Press', 'date': str(date.today()),
+            'image': SimpleUploadedFile(name, content, content_type='image/png'),
+        }, format='multipart')
+
+    def test_content_length_checked_before_reading(self):
+        with mock.patch.object(ImageUploadHandler, 'receive_data_chunk') as receive:
+            response = self.post_image(b'\0' * (1024 * 1024 + 20 * 1024))
+        self.assertEqual(response.status_code, 413)
+        receive.assert_not_called()
+
+    def test_stream_cut_off_at_byte_cap(self):
+        # Within the Content-Length allowance for form fields, so only the streamed bytes catch it
+        response = self.post_image(b'\0' * (20 * 1024))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.data['detail'], 'Uploaded file exceeds the 10.0\xa0KB limit.')
+
+    def test_dimensions_capped(self):
+        for size in ((64, 20), (40, 60), (45, 45)): # Too wide, too tall, too many pixels
+            with self.subTest(size=size):
+                response = self.post_image(image_bytes(size))
+                self.assertEqual(response.status_code, 413)
+                self.assertIn(f'Image dimensions {size[0]}x{size[1]}', response.data['detail'])
+        self.assertFalse(Workout.objects.exists())
+
+    def test_non_image_rejected(self):
+        response = self.post_image(b'not an image at all')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Upload a valid image', response.data['detail'])
+
+
+@override_settings(IMAGE_RENDITION_WORKERS=0) # Renditions generated inline, once the transaction commits
+class MediaTestCase(WorkoutAPITestCase):
+    """
+    Uploads go to a temporary MEDIA_ROOT.
+    """
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media_root = media_root
+
+    def upload(self, method, url, content, name='lift.png'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, {
+                'exercise_name': 'Bench Press', 'date': str(date.today()),
+                'image': SimpleUploadedFile(name, content, content_type='image/png'),
+            }, format='multipart')
+        self.assertLess(response.status_code, 300, response.data)
+        return response
+
+    def stored(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+
+class ContentAddressedMediaTests(MediaTestCase):
+    def log(self, content):
+        response = self.upload('post', reverse('workout-list-create'), content)
+        return Workout.objects.get(pk=response.data['id'])
+
+    def refcounts(self):
+        return dict(MediaBlob.objects.values_list('name', 'refcount'))
+
+    def test_identical_uploads_stored_once(self):
+        first, second = self.log(image_bytes()), self.log(image_bytes())
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^workout_images/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertEqual(os.listdir(os.path.dirname(os.path.join(self.media_root, first.image.name))), [
+            os.path.basename(first.image.name)
+        ])
+        self.assertEqual(self.refcounts(), {first.image.name: 2})
+
+    def test_references_follow_replace_and_delete(self):
+        first, second = self.log(image_bytes()), self.log(image_bytes())
+        old = first.image.name
+        renditions = [rendition_name(old, size, extension) for size in RENDITION_SIZES for extension in RENDITION_FORMATS]
+        self.assertTrue(all(self.stored(name) for name in renditions))
+
+        response = self.upload('patch', reverse('workout-detail', kwargs={'pk': first.pk}), image_bytes(color=(0, 0, 0)))
+        new = Workout.objects.get(pk=response.data['id']).image.name
+        self.assertNotEqual(new, old)
+        self.assertEqual(self.refcounts(), {old: 1, new: 1})
+        self.assertTrue(self.stored(old))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('workout-detail', kwargs={'pk': second.pk}))
+        self.assertEqual(self.refcounts(), {new: 1})
+        self.assertFalse(self.stored(old))
+        self.assertFalse(any(self.stored(name) for name in renditions))
+        self.assertTrue(self.stored(new))
+
+
+class ImageRenditionTests(MediaTestCase):
+    def test_renditions_written_and_linked(self):
+        response = self.upload('post', reverse('workout-list-create'), image_bytes((1200, 900)))
+        name = Workout.objects.get(pk=response.data['id']).image.name
+
+        expected_sizes = {'thumbnail': (160, 120), 'medium': (640, 480)}
+        for size, extension in ((size, extension) for size in RENDITION_SIZES for extension in RENDITION_FORMATS):
+            with self.subTest(size=size, extension=extension):
+                rendition = rendition_name(name, size, extension)
+                with Image.open(os.path.join(self.media_root, rendition)) as image:
+                    self.assertEqual((image.format, image.size), (RENDITION_FORMATS[extension], expected_sizes[size]))
+                self.assertEqual(
+                    response.data['image_renditions'][size][extension], f'http://testserver/media/{rendition}'
+                )
+
+        listed = self.client.get(reverse('workout-list-create')).data['results'][0]
+        self.assertEqual(listed['image_renditions'], response.data['image_renditions'])
+
+
+class RecomputeWeeksTests(WorkoutAPITestCase):
+    def test_deletes_weeks_left_without_workouts(self):
+        this_week = week_start(date.today())
+        last_week = this_week - timedelta(weeks=1)
+        self.add_workouts(2, day=this_week)
+        self.add_workouts(2, day=last_week)
+        user_weeks = {(self.user.pk, this_week), (self.user.pk, last_week)}
+
+        self.assertEqual(len(recompute_weeks(user_weeks)), 2)
+        Workout.objects.filter(date=last_week).delete()
+        self.assertEqual(len(recompute_weeks(user_weeks)), 1)
+        self.assertEqual(
+            list(Analytics.objects.filter(user=self.user).values_list('week_start_date', 'workout_count')),
+            [(this_week, 2)],
+        )
+
+
+class BackfillAnalyticsTests(WorkoutAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.this_week = week_start(date.today())
+        self.last_week = self.this_week - timedelta(weeks=1)
+        self.add_workouts(2, day=self.this_week)
+        self.add_workouts(2, day=self.last_week)
+        self.backfill()
+        Workout.objects.filter(date=self.last_week).delete() # Bypassing the analytics upkeep
+
+    def backfill(self, *args):
+        call_command('backfill_analytics', *args, stdout=io.StringIO())
+
+    def stored_weeks(self):
+        return set(Analytics.objects.filter(user=self.user).values_list('week_start_date', flat=True))
+
+    def test_deletes_weeks_without_workouts(self):
+        self.assertEqual(self.stored_weeks(), {self.this_week, self.last_week})
+        self.backfill()
+        self.assertEqual(self.stored_weeks(), {self.this_week})
+
+    def test_keeps_weeks_outside_range(self):
+        self.backfill('--from', str(self.this_week))
+        self.assertEqual(self.stored_weeks(), {self.this_week, self.last_week})
+
+        self.backfill('--to', str(self.last_week))
+        self.assertEqual(self.stored_weeks(), {self.this_week})
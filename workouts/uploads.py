@@ -0,0 +1,98 @@
+# workouts/uploads.py
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, UnidentifiedImageError
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import MultiPartParser
+
+# Allowance for the non-file form fields sent alongside an image
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Uploaded file is too large.'
+    default_code = 'upload_too_large'
+
+
+class UploadRejected(MultiPartParserError):
+    """
+    Raised by ImageUploadHandler to abort a multipart upload.
+    """
+    def __init__(self, message, too_large=False):
+        super().__init__(message)
+        self.too_large = too_large
+
+    def as_api_exception(self):
+        return UploadTooLarge(str(self)) if self.too_large else ParseError(str(self))
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploaded images to a temporary file, rejecting them as early as possible:
+
+    * requests whose Content-Length exceeds the limit, before any body is read;
+    * files as soon as the bytes received cross IMAGE_UPLOAD_MAX_BYTES;
+    * images whose header reports oversized dimensions, or that Pillow
+      cannot identify, once received (only the header is parsed).
+    """
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > settings.IMAGE_UPLOAD_MAX_BYTES + FORM_OVERHEAD_BYTES:
+            raise UploadRejected(self.too_large_message(), too_large=True)
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_BYTES:
+            self.file.close()
+            raise UploadRejected(self.too_large_message(), too_large=True)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+
+        try:
+            # Image.open only parses the header; pixel data is never decoded here
+            with Image.open(upload.file) as image:
+                width, height = image.size
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            upload.close()
+            raise UploadRejected("Upload a valid image. The file you uploaded was either not an image or a corrupted image.")
+
+        max_dimension = settings.IMAGE_UPLOAD_MAX_DIMENSION
+        if width > max_dimension or height > max_dimension or width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            upload.close()
+            raise UploadRejected(
+                f"Image dimensions {width}x{height} exceed the allowed maximum "
+                f"({max_dimension}px per side, {settings.IMAGE_UPLOAD_MAX_PIXELS} pixels).",
+                too_large=True,
+            )
+
+        upload.file.seek(0)
+        return upload
+
+    def too_large_message(self):
+        return f"Uploaded file exceeds the {filesizeformat(settings.IMAGE_UPLOAD_MAX_BYTES)} limit."
+
+
+class ImageMultiPartParser(MultiPartParser):
+    """
+    Multipart parser for endpoints accepting image uploads, streaming files through ImageUploadHandler.
+    """
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request._request.upload_handlers = [ImageUploadHandler(request._request)]
+
+        try:
+            return super().parse(stream, media_type, parser_context)
+        except ParseError as exc:
+            if isinstance(exc.__context__, UploadRejected):
+                raise exc.__context__.as_api_exception() from None
+            raise
@@ -2,10 +2,17 @@ from django.urls import path
 from .views import (
     WorkoutListCreateView,
     WorkoutDetailView,
+    WorkoutBulkCreateView,
+    WorkoutExportView,
+    WorkoutImportView,
     CategoryListCreateView,
     CategoryDetailView,
-    AnalyticsGenerateView
+    AnalyticsGenerateView,
+    AnalyticsHistoryView,
+    PersonalRecordListView,
+    ExerciseSearchView
 )
+from .async_views import AsyncWorkoutListView, AsyncWorkoutDetailView, AsyncAnalyticsView
 
 urlpatterns = [
     # Category URLs
@@ -15,7 +22,18 @@ urlpatterns = [
     # Workout URLs
     path('', WorkoutListCreateView.as_view(), name='workout-list-create'),
     path('<int:pk>/', WorkoutDetailView.as_view(), name='workout-detail'),
+    path('bulk/', WorkoutBulkCreateView.as_view(), name='workout-bulk-create'),
+    path('export/', WorkoutExportView.as_view(), name='workout-export'),
+    path('import/', WorkoutImportView.as_view(), name='workout-import'),
+    path('records/', PersonalRecordListView.as_view(), name='personal-records'),
+    path('exercises/', ExerciseSearchView.as_view(), name='exercise-search'),
     
     # Analytics URLs
     path('analytics/', AnalyticsGenerateView.as_view(), name='analytics-generate'),
+    path('analytics/history/', AnalyticsHistoryView.as_view(), name='analytics-history'),
+
+    # Async (ASGI-native) read endpoints
+    path('async/', AsyncWorkoutListView.as_view(), name='async-workout-list'),
+    path('async/<int:pk>/', AsyncWorkoutDetailView.as_view(), name='async-workout-detail'),
+    path('async/analytics/', AsyncAnalyticsView.as_view(), name='async-analytics'),
 ]
\ No newline at end of file
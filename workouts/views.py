@@ -1,27 +1,96 @@
 # workouts/views.py
 
+import csv
+import io
 from rest_framework import generics, permissions
+from django.db import router, transaction
+from django.db.models import Count, Max
+from django.db.models.functions import TruncWeek
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser # Add JSONParser
-from .models import Workout, Category, Analytics
+from .models import Workout, Category, Analytics, PersonalRecord
+from .exercises import search_exercises
 from rest_framework.views import APIView
 from datetime import date, timedelta
-from django.db.models import Sum, Max, F
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import WorkoutSerializer, CategorySerializer, AnalyticsSerializer
+from .serializers import (
+    WorkoutSerializer,
+    CategorySerializer,
+    AnalyticsRowSerializer,
+    ExerciseSerializer,
+    PersonalRecordSerializer,
+    WorkoutRowSerializer,
+)
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import WorkoutFilter
+from .pagination import WorkoutCursorPagination
+from .uploads import ImageMultiPartParser
+from .cache import category_cache
+from .conditional import ConditionalGetMixin, make_etag
+from GymLog.db_routers import ReplicaReadMixin
+from GymLog.metrics import measure_serialization
+from .export import CSVRenderer, NDJSONRenderer, iter_export_rows
+from .importer import WorkoutImportError, import_workouts_csv
+from .records import RecordEntry, apply_personal_records
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+from .images import is_immutable_media
+from .analytics import (
+    STRENGTH_TRAINING,
+    WorkoutContribution,
+    apply_workout_changes,
+    category_weeks,
+    rebuild_analytics,
+    recompute_week,
+    recompute_weeks,
+    refresh_derived,
+    user_weight_of,
+    week_start,
+)
+
+# Columns needed to serialize a workout; updated_at stays loaded so saves keep bumping it
+WORKOUT_API_FIELDS = (
+    'id', 'user', 'exercise_name', 'exercise', 'weight_used', 'reps', 'sets', 'date', 'notes',
+    'image', 'category', 'workout_duration_minutes', 'updated_at',
+)
+
+IMMUTABLE_MEDIA_MAX_AGE = 365 * 24 * 60 * 60 # One year, in seconds
+
+def user_workouts(user):
+    """
+    The user's workouts, fetching only the serialized columns (category names come from the category cache).
+    """
+    return Workout.objects.filter(user_id=user.pk).only(*WORKOUT_API_FIELDS)
 
 # Category Views 
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(ReplicaReadMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     List all workout categories or create a new one.
+
+    Listings are served from the category cache and carry an ETag, so
+    clients can revalidate with If-None-Match and get a 304.
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_validators(self):
+        self.snapshot = category_cache.snapshot()
+        return self.snapshot.etag, None
+
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return self.snapshot.categories()
+        return super().get_queryset()
+
+    def perform_create(self, serializer):
+        serializer.save()
+        transaction.on_commit(category_cache.invalidate)
+
 class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update, or delete a specific category.
@@ -30,124 +99,454 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """
+        Rebuild analytics when a rename changes whether the category counts as strength training.
+        """
+        was_strength = serializer.instance.name == STRENGTH_TRAINING
+        category = serializer.save()
+        self.invalidate_categories()
+        if was_strength != (category.name == STRENGTH_TRAINING):
+            recompute_weeks(category_weeks(category.pk))
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        Rebuild analytics for weeks whose strength workouts lose their category.
+        """
+        user_weeks = category_weeks(instance.pk) if instance.name == STRENGTH_TRAINING else []
+        instance.delete()
+        self.invalidate_categories()
+        recompute_weeks(user_weeks)
+
+    def invalidate_categories(self):
+        """
+        Drop cached categories now, so analytics rebuilt in this transaction
+        see the change, and again once it commits so no other process keeps
+        a snapshot taken in between.
+        """
+        category_cache.invalidate()
+        transaction.on_commit(category_cache.invalidate)
+
 # Workout Views 
-class WorkoutListCreateView(generics.ListCreateAPIView):
+class WorkoutListCreateView(ReplicaReadMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """
     List all workouts for the authenticated user or to create a new workout.
+
+    Listings carry an ETag built from the page the paginator reads anyway
+    (its rows' ids and `updated_at`, count and links), so a revalidation
+    costs no extra query and skips serialization.
     """
     serializer_class = WorkoutSerializer
     permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser] # Allow image uploads
+    parser_classes = [ImageMultiPartParser, FormParser] # Allow image uploads (size-capped, streamed to disk)
 
     pagination_class = PageNumberPagination 
+    cursor_pagination_class = WorkoutCursorPagination # Opt-in keyset pagination for deep history
     filter_backends = [DjangoFilterBackend]  # Enable query filtering
     filterset_class = WorkoutFilter
 
+    @property
+    def paginator(self):
+        """
+        Use keyset pagination when requested with `?pagination=cursor` (or when following a cursor link).
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or self.cursor_pagination_class.cursor_query_param in params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_queryset(self):
         """
         Filter the queryset to return only the workouts for the authenticated user.
         """
-        return Workout.objects.filter(user=self.request.user)
+        return user_workouts(self.request.user)
+
+    def page_rows(self):
+        """
+        The requested page as plain rows, read once per request (the validators and the listing share it).
+        """
+        if not hasattr(self, '_page_rows'):
+            rows = self.filter_queryset(self.get_queryset()).values(*WorkoutRowSerializer.fields, 'updated_at')
+            page = self.paginate_queryset(rows)
+            self.paginated = page is not None
+            self._page_rows = page if self.paginated else list(rows)
+        return self._page_rows
+
+    def list(self, request, *args, **kwargs):
+        """
+        Serialize the page's plain rows with the lean WorkoutRowSerializer.
+        """
+        rows = self.page_rows()
+        with measure_serialization(request):
+            data = WorkoutRowSerializer(rows, request).data
+        if self.paginated:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def get_validators(self):
+        """
+        No Last-Modified here: deleting a workout lowers the count but not the latest `updated_at`.
+        """
+        rows = [(row['id'], row['updated_at']) for row in self.page_rows()]
+        envelope = self.get_paginated_response([]).data if self.paginated else None # Count and links
+        etag = make_etag(
+            self.request.user.pk, rows, envelope, category_cache.snapshot().etag,
+            self.request.accepted_renderer.format, self.request.get_full_path(),
+        )
+        return etag, None
 
+    @transaction.atomic
     def perform_create(self, serializer):
         """
-        Set the user for the workout before saving.
+        Set the user for the workout before saving and fold it into the week's analytics and personal records.
         """
-        serializer.save(user=self.request.user)
+        workout = serializer.save(user_id=self.request.user.pk)
+        apply_workout_changes(
+            self.request.user.pk, user_weight_of(self.request.user),
+            added=[WorkoutContribution.from_workout(workout)]
+        )
+        apply_personal_records(self.request.user.pk, added=[RecordEntry.from_workout(workout)])
+
+class WorkoutBulkCreateView(generics.GenericAPIView):
+    """
+    Create many workouts from one JSON array (e.g. an offline sync).
+
+    Every item is validated first; if any fails, nothing is written and the
+    response lists errors per item, in request order. Valid batches are
+    inserted with one bulk INSERT inside a single transaction (one INSERT
+    per workout on backends without RETURNING, so ids are always returned).
+    """
+    serializer_class = WorkoutSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [JSONParser]
+
+    max_batch_size = 500
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.max_batch_size
+        )
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            workouts = serializer.save(user_id=request.user.pk)
+
+            # Rebuild the touched analytics weeks in one grouped pass; records only ever improve
+            recompute_weeks({(request.user.pk, week_start(workout.date)) for workout in workouts})
+            apply_personal_records(request.user.pk, added=[RecordEntry.from_workout(workout) for workout in workouts])
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class WorkoutExportView(generics.GenericAPIView):
+    """
+    Stream the authenticated user's full workout history as CSV or NDJSON.
+
+    Pick the format with `?format=csv|ndjson` or the Accept header; the
+    usual workout filters (date range, exercise name) apply.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = WorkoutFilter
+    pagination_class = None
+
+    def get_queryset(self):
+        return Workout.objects.filter(user_id=self.request.user.pk)
+
+    def get(self, request, *args, **kwargs):
+        workouts = self.filter_queryset(self.get_queryset())
+        renderer = request.accepted_renderer
+
+        response = StreamingHttpResponse(
+            renderer.stream(iter_export_rows(workouts)),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="workouts.{renderer.format}"'
+        return response
+
+class WorkoutImportView(APIView):
+    """
+    Import workout history from an uploaded CSV file (multipart field `file`).
 
-class WorkoutDetailView(generics.RetrieveUpdateDestroyAPIView):
+    Uses the export column layout; invalid rows are skipped and reported by line.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"file": ["A CSV file is required."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Decode lazily so large uploads (spooled to disk by Django) are never read whole
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            result = import_workouts_csv(request.user, stream)
+        except WorkoutImportError as e:
+            return Response({"file": [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({"file": [f"Could not read CSV: {e}"]}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            stream.detach()
+
+        return Response(result, status=status.HTTP_201_CREATED)
+
+class WorkoutDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update, or delete a specific workout.
+
+    Reads carry an ETag from the workout's `updated_at` (taken from the
+    workout the view loads anyway) and the category catalog.
     """
     queryset = Workout.objects.all()
     serializer_class = WorkoutSerializer
     permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [ImageMultiPartParser, FormParser]
 
     def get_queryset(self):
         """
         Ensure a user can only access their own workouts.
         """
-        return Workout.objects.filter(user=self.request.user)
-        
+        return user_workouts(self.request.user)
+
+    def get_object(self):
+        # Loaded once per request, for the validators and then the response
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
+
+    def get_validators(self):
+        """
+        No Last-Modified here: renaming its category changes the response but not `updated_at`.
+        """
+        workout = self.get_object()
+        etag = make_etag(
+            self.request.user.pk, workout.pk, workout.updated_at, category_cache.snapshot().etag,
+            self.request.accepted_renderer.format,
+        )
+        return etag, None
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        with measure_serialization(request):
+            data = serializer.data
+        return Response(data)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        """
+        Move the workout's contribution between analytics weeks and update personal records as it changes.
+        """
+        previous = WorkoutContribution.from_workout(serializer.instance)
+        previous_entry = RecordEntry.from_workout(serializer.instance)
+        workout = serializer.save()
+        apply_workout_changes(
+            self.request.user.pk, user_weight_of(self.request.user),
+            removed=[previous], added=[WorkoutContribution.from_workout(workout)]
+        )
+        apply_personal_records(
+            self.request.user.pk, removed=[previous_entry], added=[RecordEntry.from_workout(workout)]
+        )
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        Remove the workout's contribution from its analytics week and personal records.
+        """
+        previous = WorkoutContribution.from_workout(instance)
+        previous_entry = RecordEntry.from_workout(instance)
+        instance.delete()
+        apply_workout_changes(
+            self.request.user.pk, user_weight_of(self.request.user), removed=[previous]
+        )
+        apply_personal_records(self.request.user.pk, removed=[previous_entry])
     
-class AnalyticsGenerateView(APIView):
+class ExerciseSearchView(generics.ListAPIView):
+    """
+    Search the exercises the user has logged by name prefix (`?search=`), for autocomplete.
+    """
+    serializer_class = ExerciseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
 
-    def get(self, request, *args, **kwargs):
-        user = request.user
-        today = date.today()
-        week_start_date = today - timedelta(days=today.weekday()) # Get Monday of current week
+    max_results = 20
 
-        # Filter workouts for this user and week
+    def get_queryset(self):
+        term = self.request.query_params.get('search', '')
+        return search_exercises(term, self.request.user.pk)[:self.max_results]
 
-        weekly_workouts = Workout.objects.filter(user=user, date__gte=week_start_date)
+class PersonalRecordListView(generics.ListAPIView):
+    """
+    All of the authenticated user's personal records, one per exercise, in a single indexed query.
+    """
+    serializer_class = PersonalRecordSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None # One row per exercise, so the list stays small
 
-        if not weekly_workouts.exists():
-            return Response({"detail": "No workouts found for this week."}, status=status.HTTP_404_NOT_FOUND)
+    def get_queryset(self):
+        return PersonalRecord.objects.filter(user_id=self.request.user.pk)
 
-        # Separate workouts by category for targeted metrics
+def analytics_etag(request, first_week, last_week):
+    """
+    ETag for a user's analytics over a range of weeks.
+
+    Derived from the underlying workouts' count and latest `updated_at` plus
+    the inputs of the derived metrics (body weight, category names), so it
+    is known without reading or refreshing the analytics rows.
+    """
+    totals = Workout.objects.filter(
+        user_id=request.user.pk, date__gte=first_week, date__lt=last_week + timedelta(days=7)
+    ).aggregate(count=Count('pk'), last_updated=Max('updated_at'))
+    return make_etag(
+        request.user.pk, first_week, last_week, totals['count'], totals['last_updated'],
+        user_weight_of(request.user), category_cache.snapshot().etag, request.accepted_renderer.format,
+    )
+
+class AnalyticsGenerateView(ConditionalGetMixin, APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_validators(self):
+        week_start_date = week_start(date.today())
+        return analytics_etag(self.request, week_start_date, week_start_date), None
+
+    def get(self, request, *args, **kwargs):
+        not_modified = self.not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
 
-        strength_workouts = weekly_workouts.filter(category__name="Strength Training")
-        cardio_workouts = weekly_workouts.filter(category__name="Cardiovascular Training")
+        user = request.user
+        week_start_date = week_start(date.today()) # Get Monday of current week
+        user_weight = user_weight_of(user)
 
-        # Compute total volume: sum of (weight × reps × sets)
+        # Analytics rows are maintained on workout writes, so this is a primary-key lookup
 
-        total_volume = strength_workouts.aggregate(
-            volume=Sum(F('weight_used') * F('reps') * F('sets'))
-        )['volume'] or 0
+        analytics_record = Analytics.objects.filter(user_id=user.pk, week_start_date=week_start_date).first()
 
-        # Find max lift from strength workouts
+        # Weeks without a maintained row yet are built from the workouts once
 
-        max_lift = strength_workouts.aggregate(lift=Max('weight_used'))['lift'] or 0
+        if analytics_record is None:
+            analytics_record = recompute_week(user.pk, week_start_date, user_weight)
 
-        # Total workout duration across all workouts
+        if analytics_record is None:
+            return Response({"detail": "No workouts found for this week."}, status=status.HTTP_404_NOT_FOUND)
 
-        weekly_workout_duration_minutes = weekly_workouts.aggregate(
-            duration=Sum('workout_duration_minutes')
-        )['duration'] or 0
-        
-        # Estimate calories burned using MET formula
+        # Calories and strength level depend on the current body weight
 
-        total_calories = 0
-        user_weight = float(user.weight) if user.weight else 70.0 # Default to 70kg if not set
+        changed_fields = refresh_derived(analytics_record, user_weight)
+        if changed_fields:
+            analytics_record.save(update_fields=changed_fields)
 
-        for w in weekly_workouts:
-            met = 6.0 if w.category.name == "Strength Training" else 7.0
-            total_calories += met * 3.5 * user_weight / 200 * w.workout_duration_minutes
+        # Return serialized analytics
 
-        # Compute average intensity 
+        serializer = AnalyticsRowSerializer(analytics_record)
+        return self.with_validators(Response(serializer.data, status=status.HTTP_200_OK))
 
-        intensity = total_volume / weekly_workout_duration_minutes if weekly_workout_duration_minutes > 0 else 0
+class AnalyticsHistoryView(ReplicaReadMixin, ConditionalGetMixin, APIView):
+    """
+    Weekly analytics for a range of weeks (`?from=YYYY-MM-DD&to=YYYY-MM-DD`).
 
-        # Determine strength level based on max lift vs body weight
+    Weeks without a stored row are computed together in one grouped query
+    and saved in bulk. Defaults to the last 52 weeks.
+    """
+    permission_classes = [permissions.IsAuthenticated]
 
-        strength_level = "Beginner"
-        if max_lift >= 1.5 * user_weight:
-            strength_level = "Advanced"
-        elif max_lift >= 1.0 * user_weight:
-            strength_level = "Intermediate"
+    default_weeks = 52
+    max_weeks = 520 # Ten years of history per request
 
-        # Prepare analytics data
-        analytics_data = {
-            'week_start_date': week_start_date,
-            'total_volume': total_volume,
-            'max_lift': max_lift,
-            'average_intensity': round(intensity, 2),
-            'strength_level': strength_level,
-            'total_calories_burned': round(total_calories, 2),
-            'weekly_workout_duration_minutes': weekly_workout_duration_minutes
-        }
+    def get_validators(self):
+        return analytics_etag(self.request, *self.week_range()), None
 
-        # Create or update analytics record for the week
+    def get(self, request, *args, **kwargs):
+        not_modified = self.not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
 
-        analytics_record, _ = Analytics.objects.update_or_create(
-            user=user,
-            week_start_date=week_start_date,
-            defaults=analytics_data
+        user = request.user
+        user_weight = user_weight_of(user)
+        first_week, last_week = self.week_range()
+
+        stored_records = Analytics.objects.filter(
+            user_id=user.pk, week_start_date__gte=first_week, week_start_date__lte=last_week
         )
+        records = list(stored_records)
+
+        # Compute every missing week in a single GROUP BY pass. A lagging replica may report
+        # weeks as missing, so the rebuild reads its inputs (stored weeks and workouts) from the
+        # primary it writes to; inputs from a replica could overwrite newer rows with stale totals
+
+        if self.missing_workouts(first_week, last_week, [record.week_start_date for record in records]).exists():
+            primary = router.db_for_write(Analytics)
+            missing_workouts = self.missing_workouts(
+                first_week, last_week, stored_records.using(primary).values('week_start_date')
+            ).using(primary)
+            if rebuild_analytics(missing_workouts, {user.pk: user_weight}):
+                # Read the new rows back from the primary; a replica may not have them yet
+                records = list(stored_records.using(primary))
+
+        # Calories and strength level depend on the current body weight
+
+        changed_fields = set()
+        changed_records = []
+        for record in records:
+            changed = refresh_derived(record, user_weight)
+            if changed:
+                changed_fields.update(changed)
+                changed_records.append(record)
+        if changed_records:
+            Analytics.objects.bulk_update(changed_records, changed_fields)
+
+        serializer = AnalyticsRowSerializer(records, many=True)
+        return self.with_validators(Response(serializer.data, status=status.HTTP_200_OK))
+
+    def missing_workouts(self, first_week, last_week, stored_weeks):
+        """
+        The user's workouts in the range that fall in none of `stored_weeks`, annotated with their week.
+        """
+        return Workout.objects.filter(
+            user_id=self.request.user.pk, date__gte=first_week, date__lt=last_week + timedelta(days=7)
+        ).annotate(week=TruncWeek('date')).exclude(week__in=stored_weeks)
 
-        # Return serialized analytics
+    def week_range(self):
+        """
+        Resolve the requested range to Monday-based week boundaries.
+        """
+        last_week = week_start(self.parse_date_param('to') or date.today())
+        first_week = week_start(
+            self.parse_date_param('from') or last_week - timedelta(weeks=self.default_weeks - 1)
+        )
+
+        if first_week > last_week:
+            raise ValidationError({"from": "Must not be after 'to'."})
+        if (last_week - first_week).days // 7 >= self.max_weeks:
+            raise ValidationError({"from": f"Range cannot exceed {self.max_weeks} weeks."})
+        return first_week, last_week
 
-        serializer = AnalyticsSerializer(analytics_record)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+    def parse_date_param(self, name):
+        """
+        Read an optional ISO date from the query string.
+        """
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({name: "Enter a valid date in YYYY-MM-DD format."})
+        return parsed
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """
+    Serve an uploaded file (development only), caching content-addressed files for good.
+    """
+    response = serve(request, path, document_root, show_indexes)
+    if is_immutable_media(path):
+        # The name is derived from the content, so it can never serve different bytes
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MEDIA_MAX_AGE, immutable=True)
+    return response